@@ -4,15 +4,58 @@ Descriptive analytics on Seaborn's 'tips' dataset with 5 visuals.
 
 - Prints overall summary stats and group summaries
 - Saves figures to ./figures/
+- --stream [CSV] summarises a tips-shaped CSV of any size in constant memory, reading it in
+  chunks (../streaming_stats.py); the summary table and the box statistics of figure 2 are
+  exact for small files and within the sketch's documented error bound for large ones
+- --jobs N splits the --stream input (a CSV or Parquet file, or a directory of them) into
+  partitions aggregated by N worker processes (../partitioned.py); the merged result is the
+  same as a single-process run
+- --refresh STATE keeps the --stream aggregates in a state file with a watermark per input
+  file (../incremental.py): later runs read only rows appended since, and only figures
+  whose numbers changed are redrawn. Earlier rows are checked by size and the bytes around
+  the watermark only; add --verify to re-hash them all and catch in-place edits
+- With --stream, figure 1 comes from fixed-width bins merged across chunks and figure 4
+  becomes a binned 2-D density with the trendline fitted from running sums, so no figure
+  needs the rows in memory
 """
 
+from __future__ import annotations
+
 import os
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+import sys
+import zlib
+import argparse
+from functools import partial
+
+# Heavy libraries are imported on first use (../lazy_imports.py), so a --no-figures
+# run never loads matplotlib
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from lazy_imports import lazy_import, report_import_times
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
 
-# Only used to load the built-in dataset
-import seaborn as sns
+# Built-in dataset, served offline from the shared columnar cache (../dataset_cache.py)
+dataset_cache = lazy_import("dataset_cache")
+# Shared render scheduler (../figure_cache.py)
+figure_cache = lazy_import("figure_cache")
+# Single-pass grouped aggregates (../group_aggregates.py)
+group_aggregates = lazy_import("group_aggregates")
+# Constant-memory chunked statistics (../streaming_stats.py)
+streaming_stats = lazy_import("streaming_stats")
+# Partitioned multi-process aggregation (../partitioned.py)
+partitioned = lazy_import("partitioned")
+# Persisted state + watermark refresh for append-only inputs (../incremental.py)
+incremental = lazy_import("incremental")
+
+GROUP_COLS = ["sex", "smoker", "day", "time"]
+NUMERIC_COLS = ["total_bill", "tip", "size", "tip_pct"]
+DAY_ORDER = ["Thur", "Fri", "Sat", "Sun"]
+TIME_ORDER = ["Lunch", "Dinner"]
+# Streamed plots: total_bill histogram grid ($) and (total_bill, tip) density grid ($, $)
+BILL_BIN = 0.05
+DENSITY_BINS = (0.5, 0.1)
 
 
 def ensure_dir(path="figures"):
@@ -20,40 +63,126 @@ def ensure_dir(path="figures"):
     return path
 
 
-def load_data():
-    df = sns.load_dataset("tips")
+def add_derived(df: pd.DataFrame) -> pd.DataFrame:
     # Derive a useful metric: tip percentage
     df["tip_pct"] = df["tip"] / df["total_bill"] * 100
     # Make categorical orders explicit for nicer plots
-    day_order = ["Thur", "Fri", "Sat", "Sun"]
-    time_order = ["Lunch", "Dinner"]
-    df["day"] = pd.Categorical(df["day"], categories=day_order, ordered=True)
-    df["time"] = pd.Categorical(df["time"], categories=time_order, ordered=True)
+    df["day"] = pd.Categorical(df["day"], categories=DAY_ORDER, ordered=True)
+    df["time"] = pd.Categorical(df["time"], categories=TIME_ORDER, ordered=True)
     return df
 
 
-def print_descriptives(df: pd.DataFrame):
+def load_data():
+    return add_derived(dataset_cache.load_dataset("tips"))
+
+
+def summarize(df: pd.DataFrame):
+    """
+    One pass over the rows: counts, sums and sums of squares for every combination of
+    the category columns. All printed summaries and the group-mean figures read from it.
+    """
+    return group_aggregates.GroupCube.from_frame(df, GROUP_COLS, NUMERIC_COLS)
+
+
+def print_descriptives(df: pd.DataFrame, cube=None, summary=None):
+    """
+    df may be None when cube and summary (a streaming_stats.StreamingSummary) are given:
+    the order statistics then come from the summary's sketches.
+    """
+    cube = cube or summarize(df)
+
     print("\n=== Overall numeric summary ===")
-    print(df[["total_bill", "tip", "size", "tip_pct"]].describe().round(2))
+    if summary is None:
+        print(group_aggregates.describe(df, cube, NUMERIC_COLS).round(2))
+    else:
+        order_stats = summary.describe().loc[["min", "25%", "50%", "75%", "max"]]
+        print(pd.concat([cube.overall(NUMERIC_COLS), order_stats]).round(2))
+        if not summary.exact:
+            print("(quartiles from a KLL sketch: rank error at most ~1.7% of the row count)")
 
     print("\n=== Category counts ===")
-    for col in ["sex", "smoker", "day", "time"]:
+    for col in GROUP_COLS:
         print(f"\n{col} value counts:")
-        print(df[col].value_counts())
+        print(cube.value_counts(col))
 
     print("\n=== Average tip % by day ===")
-    print(df.groupby("day")["tip_pct"].mean().round(2))
+    print(cube.stats("day", "tip_pct")["tip_pct"].round(2))
 
     print("\n=== Average bill and tip by time ===")
-    print(df.groupby("time")[["total_bill", "tip"]].mean().round(2))
+    print(cube.stats("time", ["total_bill", "tip"]).round(2))
 
     print("\n=== Average tip % by smoker status and time ===")
-    print(df.pivot_table(values="tip_pct", index="smoker", columns="time", aggfunc="mean").round(2))
+    print(cube.pivot("tip_pct", index="smoker", columns="time").round(2))
+
+    if summary is not None:
+        print("\n=== Tip % box statistics by day ===")
+        box = pd.DataFrame(summary.box_stats("tip_pct", DAY_ORDER)).set_index("label")
+        box["fliers"] = box["fliers"].map(len)
+        print(box[["whislo", "q1", "med", "q3", "whishi", "fliers"]].rename_axis("day").round(2))
+
+
+def prepare_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Raw CSV rows -> the same dtypes load_data() produces."""
+    df = df.dropna(how="all")
+    for col, cats in dataset_cache.CATEGORIES["tips"].items():
+        df[col] = pd.Categorical(df[col], cats)
+    return add_derived(df)
+
+
+class StreamState:
+    """
+    Mergeable aggregates of any slice of the rows: the group cube, the sketch summary and
+    the binned counts and trendline sums behind figures 1 and 4.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.version = 4  # bump when the aggregates change, so saved --refresh states are rebuilt
+        self.cube = None
+        self.summary = streaming_stats.StreamingSummary(NUMERIC_COLS, group_by="day", levels=DAY_ORDER, seed=seed)
+        self.bill_hist = streaming_stats.BinnedCounts([BILL_BIN])
+        self.density = streaming_stats.BinnedCounts(DENSITY_BINS)
+        self.trend = streaming_stats.LinearFit()
+
+    def update(self, chunk: pd.DataFrame):
+        chunk = prepare_chunk(chunk)
+        cube = summarize(chunk)
+        self.cube = cube if self.cube is None else self.cube.merge(cube)
+        self.summary.update(chunk)
+        self.bill_hist.update(chunk["total_bill"])
+        self.density.update(chunk["total_bill"], chunk["tip"])
+        self.trend.update(chunk["total_bill"], chunk["tip"])
+        return self
 
+    def merge(self, other: "StreamState"):
+        self.cube = other.cube if self.cube is None else (self.cube.merge(other.cube) if other.cube else self.cube)
+        self.summary.merge(other.summary)
+        self.bill_hist.merge(other.bill_hist)
+        self.density.merge(other.density)
+        self.trend.merge(other.trend)
+        return self
 
-def fig1_hist_total_bill(df: pd.DataFrame, outdir: str):
+
+def partition_state(part, chunksize: int = 500_000):
+    """StreamState of one partition (runs in a worker process)."""
+    state = StreamState(seed=zlib.crc32(repr(part).encode()))
+    for chunk in partitioned.read_partition(part, chunksize):
+        state.update(chunk)
+    return state
+
+
+def stream_state(path: str, chunksize: int = 500_000, jobs: int = 1):
+    """
+    All the summaries of a tips-shaped source, read chunksize rows at a time. Memory stays
+    at one chunk per worker plus fixed-size state; jobs > 1 aggregates partitions in parallel.
+    """
+    build = partial(partition_state, chunksize=chunksize)
+    return partitioned.aggregate(path, build, n_jobs=jobs, n_parts=1 if jobs == 1 else None)
+
+
+def fig1_hist_total_bill(counts: np.ndarray, edges: np.ndarray, outdir: str):
+    # Pre-binned counts (np.histogram in memory, BinnedCounts.histogram when streamed)
     plt.figure(figsize=(8, 5))
-    plt.hist(df["total_bill"], bins=30)
+    plt.hist(edges[:-1], bins=edges, weights=counts)
     plt.title("Distribution of Total Bill")
     plt.xlabel("Total Bill ($)")
     plt.ylabel("Frequency")
@@ -64,11 +193,11 @@ def fig1_hist_total_bill(df: pd.DataFrame, outdir: str):
     return path
 
 
-def fig2_box_tip_pct_by_day(df: pd.DataFrame, outdir: str):
-    # Using pandas' built-in boxplot (matplotlib under the hood)
+def fig2_box_tip_pct_by_day(stats: list, outdir: str):
+    # Drawn from precomputed box statistics (streaming_stats.box_stats or a StreamingSummary)
     plt.figure(figsize=(8, 5))
-    df.boxplot(column="tip_pct", by="day")
-    plt.suptitle("")  # remove automatic suptitle
+    plt.gca().bxp(stats)
+    plt.grid(True)
     plt.title("Tip Percentage by Day")
     plt.xlabel("Day")
     plt.ylabel("Tip %")
@@ -79,8 +208,7 @@ def fig2_box_tip_pct_by_day(df: pd.DataFrame, outdir: str):
     return path
 
 
-def fig3_bar_mean_tip_pct_by_day(df: pd.DataFrame, outdir: str):
-    means = df.groupby("day")["tip_pct"].mean().reindex(df["day"].cat.categories)
+def fig3_bar_mean_tip_pct_by_day(means: pd.Series, outdir: str):
     plt.figure(figsize=(8, 5))
     means.plot(kind="bar")
     plt.title("Average Tip % by Day")
@@ -118,8 +246,27 @@ def fig4_scatter_bill_vs_tip_with_trend(df: pd.DataFrame, outdir: str):
     return path
 
 
-def fig5_heatmap_tip_pct_by_day_time(df: pd.DataFrame, outdir: str):
-    pivot = df.pivot_table(values="tip_pct", index="day", columns="time", aggfunc="mean")
+def fig4_density_bill_vs_tip_with_trend(counts: np.ndarray, xedges: np.ndarray, yedges: np.ndarray,
+                                        coeffs: np.ndarray, x_range: tuple, outdir: str):
+    # Streamed stand-in for the scatter: rows per (bill, tip) cell, log colour scale
+    plt.figure(figsize=(8, 5))
+    mesh = plt.pcolormesh(xedges, yedges, np.ma.masked_equal(counts.T, 0), norm="log", cmap="viridis")
+    xs = np.linspace(x_range[0], x_range[1], 100)
+    plt.plot(xs, np.poly1d(coeffs)(xs), color="tab:red", linewidth=2)
+    plt.colorbar(mesh, label="Rows")
+    plt.title("Tip vs Total Bill with Trendline")
+    plt.xlabel("Total Bill ($)")
+    plt.ylabel("Tip ($)")
+    eq = f"y = {coeffs[0]:.2f}x + {coeffs[1]:.2f}"
+    plt.text(0.05, 0.95, eq, transform=plt.gca().transAxes, ha="left", va="top")
+    plt.tight_layout()
+    path = os.path.join(outdir, "04_density_tip_vs_bill_trend.png")
+    plt.savefig(path, dpi=150)
+    plt.close()
+    return path
+
+
+def fig5_heatmap_tip_pct_by_day_time(pivot: pd.DataFrame, outdir: str):
     data = pivot.values
     plt.figure(figsize=(6, 5))
     im = plt.imshow(data, aspect="auto")
@@ -138,17 +285,51 @@ def fig5_heatmap_tip_pct_by_day_time(df: pd.DataFrame, outdir: str):
     return path
 
 
-def main(show: bool = False):
-    outdir = ensure_dir("figures")
-    df = load_data()
-    print_descriptives(df)
+def main(show: bool = False, figures: bool = True, stream: str = None, chunksize: int = 500_000,
+         n_jobs: int = 1, refresh: str = None, verify: bool = False):
+    if stream is not None:
+        source = stream or dataset_cache.find_source("tips")
+        if refresh:
+            # Only rows past the saved watermark are read; the rest comes from the state file
+            state, new_rows, rebuilt = incremental.refresh(source, refresh, StreamState, chunksize, verify)
+            print(f"{'Rebuilt' if rebuilt else 'Refreshed'} {refresh}: {new_rows:,} new row(s) read")
+        else:
+            state = stream_state(source, chunksize, n_jobs)
+        if state is None or state.cube is None:
+            raise SystemExit(f"No rows in {source}")
+        cube, summary = state.cube, state.summary
+        print_descriptives(None, cube, summary)
+        if not figures:
+            return
+        outdir = ensure_dir("figures")
+        bill = summary.overall["total_bill"]
+        edges = state.bill_hist.edges()  # the grid skips non-finite bills the summary keeps
+        bill_range = (max(bill.min[0], edges[0]), min(bill.max[0], edges[-1]))
+        jobs = [
+            (fig1_hist_total_bill, (*state.bill_hist.histogram(30, bill_range), outdir)),
+            (fig2_box_tip_pct_by_day, (summary.box_stats("tip_pct", DAY_ORDER), outdir)),
+            (fig3_bar_mean_tip_pct_by_day, (cube.stats("day", "tip_pct", observed=False)["tip_pct"], outdir)),
+            (fig4_density_bill_vs_tip_with_trend, (state.density.counts, state.density.edges(0),
+                                                   state.density.edges(1), state.trend.coeffs, bill_range, outdir)),
+            (fig5_heatmap_tip_pct_by_day_time, (cube.pivot("tip_pct", index="day", columns="time"), outdir)),
+        ]
+    else:
+        df = load_data()
+        cube = summarize(df)
+        print_descriptives(df, cube)
+        if not figures:
+            return
+        outdir = ensure_dir("figures")
+        jobs = [
+            (fig1_hist_total_bill, (*np.histogram(df["total_bill"], bins=30), outdir)),
+            (fig2_box_tip_pct_by_day, (streaming_stats.box_stats(df["tip_pct"], df["day"], DAY_ORDER), outdir)),
+            (fig3_bar_mean_tip_pct_by_day, (cube.stats("day", "tip_pct", observed=False)["tip_pct"], outdir)),
+            (fig4_scatter_bill_vs_tip_with_trend, (df, outdir)),
+            (fig5_heatmap_tip_pct_by_day_time, (cube.pivot("tip_pct", index="day", columns="time"), outdir)),
+        ]
 
-    paths = []
-    paths.append(fig1_hist_total_bill(df, outdir))
-    paths.append(fig2_box_tip_pct_by_day(df, outdir))
-    paths.append(fig3_bar_mean_tip_pct_by_day(df, outdir))
-    paths.append(fig4_scatter_bill_vs_tip_with_trend(df, outdir))
-    paths.append(fig5_heatmap_tip_pct_by_day_time(df, outdir))
+    # Rendered in parallel; figures whose inputs are unchanged are reused as-is
+    paths = figure_cache.render_figures(jobs, outdir)
 
     print("\nSaved figures:")
     for p in paths:
@@ -166,5 +347,30 @@ def main(show: bool = False):
 
 
 if __name__ == "__main__":
-    # Set show=True to pop up the images when running locally
-    main(show=False)
+    parser = argparse.ArgumentParser(description="Descriptive analytics on the 'tips' dataset.")
+    parser.add_argument("--show", action="store_true", help="pop up the images when running locally")
+    parser.add_argument("--no-figures", action="store_true", help="print summaries only (never loads matplotlib)")
+    parser.add_argument("--import-times", action="store_true", help="report how long each heavy import took")
+    parser.add_argument("--stream", nargs="?", const="", metavar="CSV",
+                        help="constant-memory summaries of a tips-shaped CSV (default: the tips source CSV)")
+    parser.add_argument("--chunksize", type=int, default=500_000, help="rows per chunk with --stream")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="worker processes for --stream (0 = all cores); the input may be a directory")
+    parser.add_argument("--refresh", metavar="STATE",
+                        help="with --stream: update the aggregates saved in STATE with appended rows only "
+                             "(earlier rows are checked by size and the bytes around the watermark, so "
+                             "in-place edits mid-file go unnoticed without --verify)")
+    parser.add_argument("--verify", action="store_true",
+                        help="with --refresh: re-hash every row already read and rebuild if any changed")
+    args = parser.parse_args()
+    if args.refresh and args.stream is None:
+        parser.error("--refresh needs --stream")
+    if args.verify and not args.refresh:
+        parser.error("--verify needs --refresh")
+    if args.refresh and args.jobs != 1:
+        parser.error("--refresh reads the new rows in this process; it cannot be combined with --jobs")
+
+    main(show=args.show, figures=not args.no_figures, stream=args.stream, chunksize=args.chunksize,
+         n_jobs=args.jobs or None, refresh=args.refresh, verify=args.verify)
+    if args.import_times:
+        report_import_times()
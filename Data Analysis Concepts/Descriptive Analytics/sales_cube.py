@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregated sales cube (OLAP) for the FreshMart supermarket data and larger feeds of the
+same shape.
+
+- One pass builds a GroupCube (../group_aggregates.py) over Region x City x Category x
+  order month x Payment_Method holding, per observed combination (4,139 cells for the
+  5,000 FreshMart rows, against 26,000 for the full product), the row count and the
+  count / sum / sum of squares of Sales, Profit, Cost and Quantity
+- Big CSVs are read in chunks, optionally split into partitions over worker processes
+  (../partitioned.py); the chunk cubes merge exactly
+- The cube is saved as its dictionary of levels (cube.json) plus one .npy array per
+  statistic, and memory-mapped when loaded, so a query service starts instantly
+- query() answers slice (one level), dice (several levels of several dimensions) and
+  roll-up (any subset of dimensions) requests from the cube alone, with no row scan;
+  --benchmark 200 measured about 0.7-0.8 ms/query against 3.4 ms/query for pandas on the
+  FreshMart data (the gap grows with the row count, the cube's cost does not)
+
+Usage:
+  python sales_cube.py --build                                   # ./sales_cube from the FreshMart CSV
+  python sales_cube.py --by Region month --where Category=Snacks --stat sum
+  python sales_cube.py --by City --where Region=North,South Payment_Method=Cash --stat mean
+  python sales_cube.py --by                                      # grand total of every measure
+  python sales_cube.py --benchmark 500                           # cube vs pandas groupby per query
+"""
+
+import os
+import sys
+import argparse
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+from group_aggregates import GroupCube
+import partitioned
+from dataset_cache import load_csv
+
+SOURCE = os.path.join(HERE, os.pardir, os.pardir, "Power_BI", "FreshMart Dashboard",
+                      "supermarket_sales_dataset_.csv")
+DIMS = ["Region", "City", "Category", "month", "Payment_Method"]
+MEASURES = ["Sales", "Profit", "Cost", "Quantity"]
+COLUMNS = ["Order_Date", "Region", "City", "Category", "Payment_Method", *MEASURES]
+
+
+def prepare(chunk: pd.DataFrame) -> pd.DataFrame:
+    # Order month as "YYYY-MM", so sorted levels are chronological; only the distinct
+    # months are formatted (strftime on every row dominates the build otherwise)
+    codes, months = pd.factorize(pd.to_datetime(chunk["Order_Date"]).dt.to_period("M"))
+    chunk["month"] = np.asarray(months.strftime("%Y-%m"), dtype=object)[codes]
+    return chunk
+
+
+def _partition_cube(part, chunksize: int):
+    cube = None
+    for chunk in partitioned.read_partition(part, chunksize, columns=COLUMNS):
+        c = GroupCube.from_frame(prepare(chunk), DIMS, MEASURES)
+        cube = c if cube is None else cube.merge(c)
+    return cube
+
+
+def build_cube(source: str = SOURCE, chunksize: int = 500_000, n_jobs: int = 1) -> GroupCube:
+    """Aggregate a sales CSV/Parquet file (or a directory of them) into the cube."""
+    build = partial(_partition_cube, chunksize=chunksize)
+    return partitioned.aggregate(source, build, n_jobs=n_jobs, n_parts=1 if n_jobs == 1 else None)
+
+
+def query(cube: GroupCube, by=(), where: dict = None, measures=None, stat: str = "sum") -> pd.DataFrame:
+    """
+    Roll up to the dimensions in `by` (none: grand total) after keeping only the levels in
+    `where` ({dimension: level or list of levels}). stat: count, sum, mean, var or std.
+    """
+    sub = cube.select(**where) if where else cube
+    return sub.stats(list(by), list(measures or MEASURES), stat=stat)
+
+
+def _parse_where(items) -> dict:
+    where = {}
+    for item in items or []:
+        dim, _, levels = item.partition("=")
+        if not levels:
+            raise SystemExit(f"--where expects DIMENSION=LEVEL[,LEVEL...], got {item!r}")
+        values = levels.split(",")
+        where[dim] = values if len(values) > 1 else values[0]
+    return where
+
+
+def benchmark(cube: GroupCube, source: str, n_queries: int, seed: int = 0):
+    """Time random slice / dice / roll-up queries on the cube and as pandas groupbys."""
+    import time
+
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(n_queries):
+        by = list(rng.choice(DIMS, size=rng.integers(1, 3), replace=False))
+        where = {}
+        for d in rng.choice([d for d in DIMS if d not in by], size=rng.integers(0, 3), replace=False):
+            levels = cube.levels[DIMS.index(d)]
+            where[d] = list(rng.choice(levels, size=rng.integers(1, min(3, len(levels)) + 1), replace=False))
+        queries.append((by, where))
+
+    t0 = time.perf_counter()
+    cube_results = [query(cube, by, where) for by, where in queries]
+    t_cube = time.perf_counter() - t0
+
+    df = prepare(load_csv(source, columns=COLUMNS))
+    t0 = time.perf_counter()
+    pandas_results = []
+    for by, where in queries:
+        mask = np.ones(len(df), dtype=bool)
+        for d, levels in where.items():
+            mask &= df[d].isin(levels).to_numpy()
+        pandas_results.append(df[mask].groupby(by)[MEASURES].sum())
+    t_pandas = time.perf_counter() - t0
+
+    worst = max(np.abs(c.to_numpy() - p.to_numpy()).max() if len(p) else 0.0
+                for c, p in zip(cube_results, pandas_results))
+    print(f"{n_queries} queries over {len(df):,} rows: cube {t_cube * 1000 / n_queries:.2f} ms/query, "
+          f"pandas {t_pandas * 1000 / n_queries:.2f} ms/query; max |difference| {worst:.1e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the FreshMart sales cube.")
+    parser.add_argument("--source", default=SOURCE, help="sales CSV/Parquet file or directory")
+    parser.add_argument("--cube", default="sales_cube", help="cube directory")
+    parser.add_argument("--build", action="store_true", help="(re)build the cube from --source")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for --build (0 = all cores)")
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    parser.add_argument("--by", nargs="*", choices=DIMS, help="dimensions to roll up to (none: grand total)")
+    parser.add_argument("--where", nargs="*", metavar="DIM=LEVEL[,LEVEL]", help="slice / dice filters")
+    parser.add_argument("--measures", nargs="+", choices=MEASURES)
+    parser.add_argument("--stat", default="sum", choices=["count", "sum", "mean", "var", "std"])
+    parser.add_argument("--benchmark", type=int, metavar="QUERIES", help="time random queries against pandas")
+    args = parser.parse_args()
+
+    cube = None
+    if not args.build:
+        try:
+            cube = GroupCube.load(args.cube)
+        except (OSError, ValueError):
+            pass  # not built yet, or saved in an older layout
+    if cube is None:
+        cube = build_cube(args.source, args.chunksize, args.jobs or None)
+        cube.save(args.cube)
+        print(f"Built {args.cube}: {int(cube.rows.sum()):,} rows in {len(cube.rows):,} observed cells "
+              f"({', '.join(f'{d} {len(lv)}' for d, lv in zip(cube.dims, cube.levels))})")
+        cube = GroupCube.load(args.cube)
+
+    if args.benchmark:
+        benchmark(cube, args.source, args.benchmark)
+    elif args.by is not None or args.where:
+        try:
+            result = query(cube, args.by or [], _parse_where(args.where), args.measures, args.stat)
+        except KeyError as e:
+            parser.error(f"--where: {e.args[0]}")
+        print(result.round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Array-backed, vectorised inference for the models trained in BreastCancerPredictiveAnalytics.py.
+
+- RandomForestClassifier -> CompiledForest: every tree's nodes concatenated into flat
+  feature / threshold / left / right / leaf-value arrays; a batch of rows walks all trees
+  at once with NumPy fancy indexing (leaves point at themselves, so the walk is a fixed
+  max_depth steps with no per-tree Python loop)
+- Pipeline(StandardScaler, LogisticRegression) -> CompiledLinear: the scaler is folded into
+  one weight vector and bias
+- predict_proba() returns the same (n, 2) probabilities as the sklearn model
+
+Usage:
+  python compiled_model.py --rows 20000      # parity check + benchmark against sklearn
+  python -m pytest -q test_compiled_model.py # parity tests for both model kinds
+"""
+
+import time
+import argparse
+
+import numpy as np
+
+
+class CompiledForest:
+    """Flat-array random forest for binary classification (probability of classes_[1])."""
+
+    kind = "forest"
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children      # interleaved: [2*i] left child of node i, [2*i + 1] right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset, max_depth = 0, 0
+        for est in forest.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n)
+
+            # Leaves loop back to themselves: threshold +inf always "goes left" to itself
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            pairs = np.empty((n, 2), dtype=np.int64)
+            pairs[:, 0] = np.where(is_leaf, own, tree.children_left + offset)
+            pairs[:, 1] = np.where(is_leaf, own, tree.children_right + offset)
+            children.append(pairs.ravel())
+            counts = tree.value[:, 0, :]
+            values.append(counts[:, 1] / counts.sum(axis=1))
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int32),
+            max_depth=max_depth,
+        )
+
+    @property
+    def arrays(self) -> dict:
+        return {"feature": self.feature, "threshold": self.threshold, "children": self.children,
+                "value": self.value, "roots": self.roots}
+
+    @property
+    def params(self) -> dict:
+        return {"max_depth": self.max_depth}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, params: dict):
+        return cls(**arrays, **params)
+
+    def predict_proba(self, X, batch_size: int = 512) -> np.ndarray:
+        # sklearn trees compare float32 features against float64 thresholds; do the same
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_features = X.shape[1]
+        p1 = np.empty(len(X))
+        for start in range(0, len(X), batch_size):
+            xb = X[start:start + batch_size]
+            flat = xb.ravel()
+            row_base = (np.arange(len(xb), dtype=np.int32) * n_features)[:, None]
+            node = np.broadcast_to(self.roots, (len(xb), len(self.roots))).copy()
+            for _ in range(self.max_depth):
+                go_right = flat[row_base + self.feature[node]] > self.threshold[node]
+                node = self.children[2 * node + go_right]
+            p1[start:start + len(xb)] = self.value[node].mean(axis=1)
+        return np.column_stack([1 - p1, p1])
+
+
+class CompiledLinear:
+    """StandardScaler + LogisticRegression folded into a single weight vector and bias."""
+
+    kind = "linear"
+
+    def __init__(self, weights, bias):
+        self.weights = weights
+        self.bias = float(bias)
+
+    @classmethod
+    def from_sklearn(cls, pipeline):
+        scaler, clf = pipeline.named_steps["scaler"], pipeline.named_steps["clf"]
+        coef = clf.coef_.ravel()
+        scale = np.where(scaler.scale_ == 0, 1.0, scaler.scale_) if scaler.with_std else np.ones_like(coef)
+        mean = scaler.mean_ if scaler.with_mean else np.zeros_like(coef)
+        weights = coef / scale
+        return cls(weights=weights, bias=clf.intercept_[0] - mean @ weights)
+
+    @property
+    def arrays(self) -> dict:
+        return {"weights": self.weights}
+
+    @property
+    def params(self) -> dict:
+        return {"bias": self.bias}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, params: dict):
+        return cls(**arrays, **params)
+
+    def predict_proba(self, X) -> np.ndarray:
+        z = np.asarray(X, dtype=np.float64) @ self.weights + self.bias
+        p1 = 0.5 * (1.0 + np.tanh(0.5 * z))   # overflow-free logistic
+        return np.column_stack([1 - p1, p1])
+
+
+COMPILED_KINDS = {cls.kind: cls for cls in (CompiledForest, CompiledLinear)}
+
+
+def compile_model(model):
+    """
+    Compile a fitted RandomForestClassifier or scaler+logistic Pipeline. Only binary,
+    single-output classifiers are supported (ValueError otherwise): the compiled models
+    return one positive-class probability per row.
+    """
+    clf = model.steps[-1][1] if hasattr(model, "steps") else model
+    classes = getattr(clf, "classes_", None)
+    if getattr(clf, "n_outputs_", 1) != 1 or classes is None or np.ndim(classes) != 1 or len(classes) != 2:
+        raise ValueError(f"Only binary, single-output classifiers can be compiled; {type(clf).__name__} has "
+                         f"{getattr(clf, 'n_outputs_', 1)} output(s) and classes {classes!r}")
+    if hasattr(model, "estimators_"):
+        return CompiledForest.from_sklearn(model)
+    if hasattr(model, "named_steps"):
+        return CompiledLinear.from_sklearn(model)
+    raise TypeError(f"Don't know how to compile {type(model).__name__}")
+
+
+def check_parity(model, compiled, X, atol: float = 1e-9) -> float:
+    """Max absolute probability difference vs sklearn; raises if above atol."""
+    expected = model.predict_proba(X)
+    got = compiled.predict_proba(np.asarray(X))
+    diff = float(np.max(np.abs(expected - got)))
+    if diff > atol:
+        raise AssertionError(f"compiled model differs from sklearn by {diff:.3g} (> {atol:g})")
+    return diff
+
+
+def benchmark(model, compiled, X, batch_sizes=(1, 32, 256, None), repeats: int = 3) -> list:
+    """
+    Best-of-N wall time per call for sklearn vs compiled predict_proba at several batch sizes
+    (None = all rows in one call). Small batches are the online-scoring case, where sklearn's
+    per-call validation and thread dispatch dominate; very large batches favour its C traversal.
+    """
+    def best(fn, data):
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            fn(data)
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    results = []
+    for size in batch_sizes:
+        rows = X if size is None else X.iloc[:size]
+        t_sklearn = best(model.predict_proba, rows)
+        t_compiled = best(compiled.predict_proba, rows.to_numpy())
+        results.append({"rows": len(rows), "sklearn_s": t_sklearn, "compiled_s": t_compiled,
+                        "speedup": t_sklearn / t_compiled})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity check and benchmark of the compiled models.")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows in the largest benchmark batch")
+    args = parser.parse_args()
+
+    from BreastCancerPredictiveAnalytics import load_data, train_models
+
+    X, y, _ = load_data()
+    (_, X_test, _, _), models, _, _, _ = train_models(X, y)
+    rng = np.random.default_rng(0)
+    X_bench = X.iloc[rng.integers(0, len(X), args.rows)]
+
+    for name, model in models.items():
+        compiled = compile_model(model)
+        diff = check_parity(model, compiled, X_test)
+        print(f"\n{name}  (parity on test set: max |Δp| = {diff:.2e})")
+        print(f"  {'rows/call':>10} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8}")
+        for r in benchmark(model, compiled, X_bench):
+            print(f"  {r['rows']:>10,} {r['sklearn_s'] * 1000:>12.2f} {r['compiled_s'] * 1000:>12.2f} "
+                  f"{r['speedup']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Successive-halving hyperparameter search over both model families of
+BreastCancerPredictiveAnalytics.py.
+
+- Random candidates are drawn from each family's search space (SEARCH_SPACES)
+- Rung 0 scores every candidate on a small stratified subsample of each CV fold's training
+  rows (and, for the forest, a proportionally small tree budget); each later rung keeps the
+  top 1/eta candidates of each family and multiplies the budget by eta, up to the full data
+  and 400 trees. Families are ranked separately, so one that learns slowly on small budgets
+  is never knocked out by the other
+- Score = mean ROC-AUC over stratified k folds; trials run in a joblib process pool with
+  the training data memory-mapped from one .npy copy
+- Every finished trial is appended to an on-disk JSON-lines cache keyed by data fingerprint,
+  family, parameters, budget and fold, so an interrupted search resumes where it stopped
+  (default: ../datasets/.cache/search_trials.jsonl, next to the other git-ignored caches)
+
+Usage:
+  python hyperparameter_search.py --candidates 16 --eta 3 --cache search_trials.jsonl
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+FULL_TREES = 400
+DEFAULT_CACHE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                              "datasets", ".cache", "search_trials.jsonl"))
+
+# Pipeline parameters use the step prefix ("clf__"), forest parameters are plain
+SEARCH_SPACES = {
+    "LogisticRegression": {
+        "clf__C": ("log-uniform", 1e-3, 1e2),
+        "clf__class_weight": ("choice", [None, "balanced"]),
+    },
+    "RandomForest": {
+        "max_depth": ("choice", [None, 4, 8, 16]),
+        "min_samples_leaf": ("choice", [1, 2, 4, 8]),
+        "max_features": ("choice", ["sqrt", "log2", 0.3, 0.6]),
+    },
+}
+
+
+def sample_candidates(n_per_family: int, random_state: int = 0) -> list:
+    """[(family, params), ...] drawn at random from SEARCH_SPACES, without repeats."""
+    rng = np.random.default_rng(random_state)
+    candidates = []
+    for family, space in SEARCH_SPACES.items():
+        seen = set()
+        for _ in range(n_per_family * 20):  # small discrete spaces may have fewer distinct points
+            if len(seen) == n_per_family:
+                break
+            params = {}
+            for name, (kind, *spec) in space.items():
+                if kind == "log-uniform":
+                    params[name] = float(np.exp(rng.uniform(np.log(spec[0]), np.log(spec[1]))))
+                else:
+                    choices = spec[0]
+                    params[name] = choices[rng.integers(len(choices))]
+            key = json.dumps(params, sort_keys=True, default=str)
+            if key not in seen:
+                seen.add(key)
+                candidates.append((family, params))
+    return candidates
+
+
+class TrialCache:
+    """Append-only JSON-lines store of finished trials: {key: roc_auc}."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.scores = {}
+        self._torn = False
+        if path and os.path.exists(path):
+            with open(path) as f:
+                text = f.read()
+            self._torn = bool(text) and not text.endswith("\n")
+            for line in text.splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted run
+                self.scores[record["key"]] = record["roc_auc"]
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def add(self, key: str, roc_auc: float, **info):
+        self.scores[key] = roc_auc
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a") as f:
+                if self._torn:  # finish the cut-off line so it does not swallow this record
+                    f.write("\n")
+                    self._torn = False
+                f.write(json.dumps({"key": key, "roc_auc": roc_auc, **info}, default=str) + "\n")
+
+
+def _run_trial(make_models, family, params, fraction, X_path, y_path, train_idx, test_idx, seed):
+    from sklearn.model_selection import train_test_split
+    from evaluation import ThresholdCurve
+
+    X = np.load(X_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+    if fraction < 1:
+        train_idx, _ = train_test_split(train_idx, train_size=fraction, stratify=y[train_idx], random_state=seed)
+    model = make_models(seed)[family]
+    model.set_params(**params)
+    if family == "RandomForest":
+        model.set_params(n_estimators=max(10, int(round(FULL_TREES * fraction))), n_jobs=1)
+    model.fit(X[train_idx], y[train_idx])
+    return ThresholdCurve.from_scores(y[test_idx], model.predict_proba(X[test_idx])[:, 1]).roc_auc
+
+
+def _run_keyed(key, *args):
+    return key, _run_trial(*args)
+
+
+def successive_halving(make_models, X: pd.DataFrame, y: pd.Series, n_candidates: int = 16,
+                       eta: int = 3, min_fraction: float = None, n_splits: int = 3,
+                       cache_path: str = None, random_state: int = 42, n_jobs: int = -1):
+    """
+    Returns (best_params, trials): the winning parameters per family and a DataFrame with
+    one row per (candidate, rung) holding the budget and mean ROC-AUC.
+    make_models(random_state) must return the unfitted models keyed by family name.
+    min_fraction defaults to the budget that leaves about one candidate per family at full size.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    candidates = sample_candidates(n_candidates, random_state)
+    per_family = max(sum(1 for fam, _ in candidates if fam == family) for family in SEARCH_SPACES)
+    n_rungs = max(1, int(np.ceil(np.log(per_family) / np.log(eta) - 1e-9)))
+    min_fraction = min_fraction or float(eta) ** -(n_rungs - 1)
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X, y))
+
+    X_arr = np.ascontiguousarray(X, dtype=np.float64)
+    y_arr = np.ascontiguousarray(y)
+    fingerprint = hashlib.sha256(X_arr.tobytes() + y_arr.tobytes()).hexdigest()[:16]
+    cache = TrialCache(cache_path)
+
+    alive = list(range(len(candidates)))
+    rows, fraction, rung = [], min_fraction, 0
+    with tempfile.TemporaryDirectory() as tmp, Parallel(n_jobs=n_jobs, return_as="generator_unordered") as parallel:
+        X_path, y_path = os.path.join(tmp, "X.npy"), os.path.join(tmp, "y.npy")
+        np.save(X_path, X_arr)
+        np.save(y_path, y_arr)
+        while True:
+            fraction = min(1.0, fraction)
+            trials = {}
+            for c in alive:
+                family, params = candidates[c]
+                for f, (tr, te) in enumerate(folds):
+                    key = cache.key(fingerprint, family, params, round(fraction, 6), f, n_splits, random_state)
+                    trials[key] = (c, f, tr, te)
+
+            todo = [k for k in trials if k not in cache.scores]
+            if todo:
+                jobs = (delayed(_run_keyed)(k, make_models, *candidates[trials[k][0]], fraction, X_path, y_path,
+                                            trials[k][2], trials[k][3], random_state + trials[k][1])
+                        for k in todo)
+                for key, auc in parallel(jobs):
+                    c, f, _, _ = trials[key]
+                    cache.add(key, auc, family=candidates[c][0], params=candidates[c][1],
+                              fraction=fraction, fold=f)
+
+            scores = {c: [] for c in alive}
+            for key, (c, _, _, _) in trials.items():
+                scores[c].append(cache.scores[key])
+            for c in alive:
+                rows.append({"rung": rung, "fraction": fraction, "family": candidates[c][0],
+                             "params": candidates[c][1], "roc_auc": float(np.mean(scores[c]))})
+
+            if fraction >= 1.0 or len(alive) <= len({candidates[c][0] for c in alive}):
+                break
+            # One race per family: each keeps its own top 1/eta
+            ranked = sorted(alive, key=lambda c: np.mean(scores[c]), reverse=True)
+            alive = []
+            for family in SEARCH_SPACES:
+                mine = [c for c in ranked if candidates[c][0] == family]
+                alive += mine[:max(1, len(mine) // eta)]
+            fraction *= eta
+            rung += 1
+
+    trials = pd.DataFrame(rows)
+    best_params = {}
+    for family in SEARCH_SPACES:
+        mine = trials[trials["family"] == family]
+        if len(mine):
+            top = mine.sort_values(["rung", "roc_auc"], ascending=False).iloc[0]
+            best_params[family] = top["params"]
+    return best_params, trials
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving search for both model families.")
+    parser.add_argument("--candidates", type=int, default=16, help="random candidates per family")
+    parser.add_argument("--eta", type=int, default=3, help="keep 1/eta of the candidates per rung")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="trial cache file (resumes from it)")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    import time
+    from sklearn.model_selection import train_test_split
+    from BreastCancerPredictiveAnalytics import load_data, make_models
+
+    X, y, _ = load_data()
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.25, stratify=y, random_state=42)
+    cached = len(TrialCache(args.cache).scores)
+    t0 = time.perf_counter()
+    best, trials = successive_halving(make_models, X_train, y_train, n_candidates=args.candidates,
+                                      eta=args.eta, cache_path=args.cache, n_jobs=args.n_jobs)
+    print(f"Search finished in {time.perf_counter() - t0:.1f} s ({cached} trial(s) reused from {args.cache})")
+    for rung, grp in trials.groupby("rung"):
+        print(f"  rung {rung}: {len(grp):>3} candidate(s) at {grp['fraction'].iloc[0]:.0%} budget, "
+              f"best ROC-AUC {grp['roc_auc'].max():.4f}")
+    for family, params in best.items():
+        print(f"  {family}: {params}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Versioned on-disk store for the models trained in BreastCancerPredictiveAnalytics.py.
+
+- Each save is a new folder (models/v0001, v0002, ...) holding one raw .npy file per model
+  array (compiled_model.py layout) and a manifest.json with the model kinds, parameters,
+  metrics, feature names and the selected best_name
+- Arrays are memory-mapped read-only on load: nothing is parsed or copied, so cold start is
+  near zero and every process scoring from the same version shares one page-cached copy
+- Versions are written to a temporary folder and renamed into place; LATEST names the newest
+
+Usage:
+  python BreastCancerPredictiveAnalytics.py --no-figures --save-model models
+  python model_store.py --root models       # list versions and time a cold load
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import numbers
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from compiled_model import COMPILED_KINDS, compile_model
+
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+LATEST_NAME = "LATEST"
+
+
+def list_versions(root: str = "models") -> list:
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if re.fullmatch(r"v\d{4,}", d))
+
+
+def _write_atomic(path: str, text: str):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def save_models(models: dict, preds: dict, best_name: str, feature_names, root: str = "models") -> str:
+    """Compile every fitted model and write them as a new version. Returns the version folder."""
+    os.makedirs(root, exist_ok=True)
+    versions = list_versions(root)
+    version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+    tmp = os.path.join(root, f".{version}.{os.getpid()}.tmp")
+    os.makedirs(tmp)
+    try:
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "version": version,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "best_name": best_name,
+            "feature_names": list(feature_names),
+            "models": {},
+        }
+        for name, model in models.items():
+            compiled = compile_model(model)
+            files = {}
+            for key, arr in compiled.arrays.items():
+                files[key] = f"{name}.{key}.npy"
+                np.save(os.path.join(tmp, files[key]), np.ascontiguousarray(arr))
+            manifest["models"][name] = {
+                "kind": compiled.kind,
+                "params": compiled.params,
+                "arrays": files,
+                # Scalar metrics only (the per-row y_pred / y_prob arrays are not kept); the
+                # cross-validated ones, if any, are stored with a cv_ prefix
+                "metrics": {**{k: float(v) for k, v in preds.get(name, {}).items() if isinstance(v, numbers.Real)},
+                            **{f"cv_{k}": float(v) for k, v in preds.get(name, {}).get("cv", {}).items()
+                               if isinstance(v, numbers.Real)}},
+            }
+        with open(os.path.join(tmp, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        path = os.path.join(root, version)
+        os.rename(tmp, path)  # fails rather than overwrite if another run took this version
+    finally:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)  # lost the rename race (or failed part-way): drop the partial version
+    _write_atomic(os.path.join(root, LATEST_NAME), version)
+    return path
+
+
+class ModelArtifact:
+    """
+    One stored version. Only the manifest is read up front; a model's arrays are
+    memory-mapped the first time that model is requested.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["format_version"] > FORMAT_VERSION:
+            raise ValueError(
+                f"{path} uses model format {self.manifest['format_version']}; "
+                f"this code reads up to {FORMAT_VERSION}"
+            )
+        self._loaded = {}
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    @property
+    def best_name(self) -> str:
+        return self.manifest["best_name"]
+
+    @property
+    def feature_names(self) -> list:
+        return self.manifest["feature_names"]
+
+    @property
+    def metrics(self) -> dict:
+        return {name: entry["metrics"] for name, entry in self.manifest["models"].items()}
+
+    def model(self, name: str = None):
+        """Compiled model by name (default: best_name), arrays memory-mapped read-only."""
+        name = name or self.best_name
+        if name not in self._loaded:
+            entry = self.manifest["models"][name]
+            arrays = {key: np.load(os.path.join(self.path, fname), mmap_mode="r")
+                      for key, fname in entry["arrays"].items()}
+            self._loaded[name] = COMPILED_KINDS[entry["kind"]].from_arrays(arrays, entry["params"])
+        return self._loaded[name]
+
+    @property
+    def best_model(self):
+        return self.model()
+
+
+def load_models(root: str = "models", version: str = None) -> ModelArtifact:
+    """Open a stored version (default: the one named in LATEST)."""
+    if version is None:
+        try:
+            with open(os.path.join(root, LATEST_NAME)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            versions = list_versions(root)
+            if not versions:
+                raise FileNotFoundError(f"No saved models under {os.path.abspath(root)}") from None
+            version = versions[-1]
+    return ModelArtifact(os.path.join(root, version))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the versioned model store.")
+    parser.add_argument("--root", default="models", help="store folder")
+    parser.add_argument("--version", default=None, help="version to open (default: latest)")
+    args = parser.parse_args()
+
+    print("Versions:", ", ".join(list_versions(args.root)) or "(none)")
+    t0 = time.perf_counter()
+    artifact = load_models(args.root, args.version)
+    model = artifact.best_model
+    elapsed = time.perf_counter() - t0
+
+    print(f"\n{artifact.version}  (created {artifact.manifest['created']})")
+    print(f"  Best model: {artifact.best_name}  ({len(artifact.feature_names)} features)")
+    for name, m in artifact.metrics.items():
+        print(f"  {name:<20} ROC-AUC {m.get('roc_auc', float('nan')):.3f}  Accuracy {m.get('accuracy', float('nan')):.3f}")
+    print(f"  Cold load of {artifact.best_name} ({type(model).__name__}): {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
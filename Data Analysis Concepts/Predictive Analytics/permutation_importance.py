@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Model-agnostic permutation importance (used by fig5_feature_importance).
+
+- Importance of a feature = drop in test ROC-AUC when that column is shuffled, so Random
+  Forest and Logistic Regression results are on the same scale
+- A batch of features is permuted into one stacked matrix and scored with a single
+  predict_proba call; each AUC comes from one sort (evaluation.py)
+- Batches run in a joblib process pool; the test matrix is written once to .npy and
+  memory-mapped read-only by every worker
+- Repeats run in rounds; with top_k set, a feature stops being re-scored once its
+  mean ± z·SE interval lies entirely above or below the top_k cut-off
+
+Usage:
+  python permutation_importance.py --repeats 20 --top-k 10
+"""
+
+import os
+import copy
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from evaluation import ThresholdCurve
+
+
+def _predict(model, X, columns):
+    if columns is not None:
+        X = pd.DataFrame(X, columns=columns)
+    return model.predict_proba(X)[:, 1]
+
+
+def _score_batch(model, X_path: str, y_path: str, columns, features, repeat: int,
+                 random_state: int, baseline: float) -> list:
+    X = np.load(X_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+    n = len(X)
+    stacked = np.tile(X, (len(features), 1))
+    for k, j in enumerate(features):
+        rng = np.random.default_rng([random_state, repeat, j])
+        stacked[k * n:(k + 1) * n, j] = X[rng.permutation(n), j]
+    proba = _predict(model, stacked, columns)
+    return [baseline - ThresholdCurve.from_scores(y, proba[k * n:(k + 1) * n]).roc_auc
+            for k in range(len(features))]
+
+
+def permutation_importance(model, X: pd.DataFrame, y, n_repeats: int = 10, batch_size: int = 8,
+                           top_k: int = None, min_repeats: int = 3, z: float = 2.0,
+                           random_state: int = 0, n_jobs: int = -1) -> pd.DataFrame:
+    """
+    ROC-AUC drop per feature over up to n_repeats shuffles. Returns a DataFrame indexed by
+    feature with columns importance (mean), std and repeats, sorted by importance.
+    With top_k, features whose interval is clear of the top_k cut stop after min_repeats.
+    """
+    from joblib import Parallel, delayed
+
+    columns = list(X.columns) if hasattr(X, "columns") else None
+    if n_jobs != 1 and "n_jobs" in getattr(model, "__dict__", {}):
+        model = copy.copy(model)  # batches already run in parallel
+        model.n_jobs = 1
+    y = np.asarray(y)
+    values = np.ascontiguousarray(X, dtype=np.float64)
+    baseline = ThresholdCurve.from_scores(y, _predict(model, values, columns)).roc_auc
+    p = values.shape[1]
+    scores = [[] for _ in range(p)]
+    active = list(range(p))
+
+    with tempfile.TemporaryDirectory() as tmp, Parallel(n_jobs=n_jobs) as parallel:
+        X_path, y_path = os.path.join(tmp, "X.npy"), os.path.join(tmp, "y.npy")
+        np.save(X_path, values)
+        np.save(y_path, y)
+        for repeat in range(n_repeats):
+            batches = [active[i:i + batch_size] for i in range(0, len(active), batch_size)]
+            results = parallel(
+                delayed(_score_batch)(model, X_path, y_path, columns, batch, repeat, random_state, baseline)
+                for batch in batches
+            )
+            for batch, drops in zip(batches, results):
+                for j, drop in zip(batch, drops):
+                    scores[j].append(drop)
+
+            if top_k and repeat + 1 >= min_repeats and top_k < p:
+                mean = np.array([np.mean(s) for s in scores])
+                half = np.array([z * np.std(s, ddof=1) / np.sqrt(len(s)) for s in scores])
+                ranked = np.sort(mean)[::-1]
+                cut = (ranked[top_k - 1] + ranked[top_k]) / 2
+                active = [j for j in active if mean[j] - half[j] <= cut <= mean[j] + half[j]]
+                if not active:
+                    break
+
+    result = pd.DataFrame({
+        "importance": [np.mean(s) for s in scores],
+        "std": [np.std(s, ddof=1) if len(s) > 1 else 0.0 for s in scores],
+        "repeats": [len(s) for s in scores],
+    }, index=pd.Index(columns if columns is not None else range(p), name="feature"))
+    return result.sort_values("importance", ascending=False, kind="stable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Permutation importance for both models.")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=10, help="early-stop features clear of the top-k cut (0 = off)")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    import time
+    from BreastCancerPredictiveAnalytics import load_data, train_models
+
+    X, y, _ = load_data()
+    (_, X_test, _, y_test), models, _, _, _ = train_models(X, y)
+    for name, model in models.items():
+        t0 = time.perf_counter()
+        imp = permutation_importance(model, X_test, y_test, n_repeats=args.repeats,
+                                     top_k=args.top_k or None, n_jobs=args.n_jobs)
+        elapsed = time.perf_counter() - t0
+        print(f"\n{name}: {elapsed:.2f} s, {imp['repeats'].sum()} of {args.repeats * len(imp)} "
+              f"feature-repeats scored")
+        print(imp.head(args.top_k or 10).round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
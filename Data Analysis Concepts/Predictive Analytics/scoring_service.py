@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Long-lived scoring service for the model selected by BreastCancerPredictiveAnalytics.py.
+
+- Trains once at startup and keeps best_model in memory
+- Micro-batches incoming rows: a batch is scored with one predict_proba call as soon as it
+  holds --max-batch rows or its oldest row has waited --max-wait-ms
+- Local HTTP endpoint (standard library only):
+    POST /predict  {"rows": [[30 feature values], ...]}  or  {"rows": [{feature: value}, ...]}
+                   -> {"proba": [...]}   (probability of class 1 = benign)
+    GET  /stats    -> request/row/batch counters, throughput and p50/p99 latency in ms
+
+Usage:
+  python scoring_service.py --port 8765 --max-batch 256 --max-wait-ms 2
+  python scoring_service.py --compiled    # score with the array-backed model (compiled_model.py)
+  python scoring_service.py --model-dir models   # serve the latest saved version, no training
+  curl -s localhost:8765/stats
+"""
+
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+
+class MicroBatcher:
+    """
+    Collects rows from many concurrent callers into batches for one vectorised predict call.
+    Requests are never split, so a single request larger than max_batch forms its own batch.
+    """
+
+    def __init__(self, predict_fn, max_batch: int = 256, max_wait: float = 0.002,
+                 latency_window: int = 10_000):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._started = time.perf_counter()
+        self.requests = self.rows = self.batches = self.errors = 0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, rows: np.ndarray) -> Future:
+        fut = Future()
+        self._queue.put((time.perf_counter(), rows, fut))
+        return fut
+
+    def predict(self, rows: np.ndarray, timeout: float = None) -> np.ndarray:
+        t0 = time.perf_counter()
+        result = self.submit(rows).result(timeout)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - t0)
+            self.requests += 1
+        return result
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, n_rows = [item], len(item[1])
+            deadline = item[0] + self.max_wait
+            stop = False
+            while n_rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+                n_rows += len(nxt[1])
+
+            self._score(batch)
+            if stop:
+                return
+
+    def _score(self, batch):
+        try:
+            proba = self.predict_fn(np.vstack([rows for _, rows, _ in batch]))
+        except Exception as e:
+            if len(batch) == 1:
+                with self._lock:
+                    self.errors += 1
+                batch[0][2].set_exception(e)
+                return
+            # Re-score request by request, so only the failing one gets the error
+            for item in batch:
+                self._score([item])
+            return
+        offset = 0
+        for _, rows, fut in batch:
+            fut.set_result(proba[offset:offset + len(rows)])
+            offset += len(rows)
+        with self._lock:
+            self.rows += offset
+            self.batches += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lat = np.array(self._latencies) * 1000
+            uptime = time.perf_counter() - self._started
+            return {
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+                "rows_per_sec": self.rows / uptime if uptime else 0.0,
+                "latency_p50_ms": float(np.percentile(lat, 50)) if lat.size else None,
+                "latency_p99_ms": float(np.percentile(lat, 99)) if lat.size else None,
+                "uptime_s": uptime,
+            }
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+
+def make_predict_fn(model, feature_names):
+    """predict_proba for class 1 on a raw 2-D array (one DataFrame per batch, not per row)."""
+    def predict(X: np.ndarray) -> np.ndarray:
+        return model.predict_proba(pd.DataFrame(X, columns=feature_names))[:, 1]
+    return predict
+
+
+class ScoringServer(ThreadingHTTPServer):
+    request_queue_size = 1024   # socketserver's default backlog of 5 resets bursts of clients
+    daemon_threads = True
+
+
+def make_handler(batcher: MicroBatcher, feature_names):
+    n_features = len(feature_names)
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send(self, code: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send(200, batcher.stats())
+            else:
+                self._send(404, {"error": "unknown path"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"error": "unknown path"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                rows = payload["rows"]
+                if rows and isinstance(rows[0], dict):
+                    rows = [[r[f] for f in feature_names] for r in rows]
+                X = np.asarray(rows, dtype=np.float64)
+                if X.size == 0:
+                    X = X.reshape(0, n_features)
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, {"error": f"bad request: {e}"})
+                return
+            # Checked before queueing, so a malformed request never joins someone else's batch
+            if X.ndim != 2 or X.shape[1] != n_features:
+                self._send(400, {"error": f"bad request: expected rows of {n_features} feature values, "
+                                          f"got an array of shape {list(X.shape)}"})
+                return
+            if not np.isfinite(X).all():
+                self._send(400, {"error": "bad request: feature values must be finite numbers"})
+                return
+            if not len(X):
+                self._send(200, {"proba": []})  # nothing to score; never queued
+                return
+            try:
+                proba = batcher.predict(X)
+            except Exception as e:
+                self._send(500, {"error": f"scoring failed: {type(e).__name__}: {e}"})
+                return
+            self._send(200, {"proba": proba.tolist()})
+
+        def log_message(self, format, *args):
+            pass  # keep the hot path quiet
+
+    return ScoringHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching scoring service for the selected model.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch", type=int, default=256, help="rows per predict call (upper bound)")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="longest a row waits for its batch to fill")
+    parser.add_argument("--compiled", action="store_true", help="score with the array-backed compiled model")
+    parser.add_argument("--model-dir", default=None,
+                        help="serve the latest version from this model store instead of training")
+    args = parser.parse_args()
+
+    if args.model_dir:
+        from model_store import load_models
+        artifact = load_models(args.model_dir)
+        best_name, feature_names, compiled = artifact.best_name, artifact.feature_names, artifact.best_model
+        print(f"Serving {best_name} from {artifact.path} "
+              f"(ROC-AUC {artifact.metrics[best_name].get('roc_auc', float('nan')):.3f})")
+        predict_fn = lambda X: compiled.predict_proba(X)[:, 1]
+    else:
+        from BreastCancerPredictiveAnalytics import load_data, train_models
+
+        X, y, _ = load_data()
+        _, _, preds, best_name, best_model = train_models(X, y)
+        feature_names = list(X.columns)
+        print(f"Serving {best_name} (test ROC-AUC {preds[best_name]['roc_auc']:.3f})")
+
+        if args.compiled:
+            from compiled_model import compile_model
+            compiled = compile_model(best_model)
+            predict_fn = lambda X: compiled.predict_proba(X)[:, 1]
+        else:
+            predict_fn = make_predict_fn(best_model, feature_names)
+
+    batcher = MicroBatcher(predict_fn,
+                           max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    server = ScoringServer((args.host, args.port), make_handler(batcher, feature_names))
+    print(f"Listening on http://{args.host}:{args.port}  (POST /predict, GET /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print(json.dumps(batcher.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Out-of-core logistic regression for tables larger than memory.
+
+- iter_chunks() reads a CSV (pandas chunks), a Parquet file (pyarrow record batches, only the
+  needed columns) or an in-memory DataFrame one chunk at a time
+- Pass 1 fits StandardScaler.partial_fit and collects the class labels; every epoch then
+  streams the chunks again, shuffled within each chunk, into
+  SGDClassifier(loss="log_loss").partial_fit
+- The result is an ordinary Pipeline(scaler, clf), so predict_proba, compiled_model.py and
+  model_store.py work on it unchanged
+- A hash of each row's position decides the held-out test rows, so the same rows are held
+  out in every pass without storing any indices
+- StreamingMetrics accumulates accuracy, the confusion matrix, per-class precision/recall/F1
+  and, for binary targets, ROC-AUC (evaluation.py) chunk by chunk
+- run_stream_script() is the --stream path of the DEC23 Titanic scripts: train, print the
+  held-out report and optionally predict another file
+- Memory use is one chunk plus the model, whatever the file size
+
+Usage:
+  python streaming_logistic.py data.csv --target y --features a b c --epochs 5
+  python streaming_logistic.py --demo 5000000      # synthetic CSV, reports peak memory
+"""
+
+import os
+import argparse
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+from evaluation import ChunkedEvaluator
+
+
+def iter_chunks(source, chunksize: int = 100_000, columns=None):
+    """Yield DataFrame chunks from a CSV path, a Parquet path or a DataFrame."""
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            chunk = source.iloc[start:start + chunksize]
+            yield chunk if columns is None else chunk[list(columns)]
+        return
+    if str(source).lower().endswith((".parquet", ".pq")):
+        if importlib.util.find_spec("pyarrow") is None:
+            raise SystemExit("Reading Parquet needs pyarrow. Install it with: pip install pyarrow")
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(source, chunksize=chunksize, usecols=columns)
+
+
+def holdout_mask(positions: np.ndarray, test_size: float, seed: int = 0) -> np.ndarray:
+    """Deterministic per-row test assignment from the row's position in the source."""
+    h = (positions.astype(np.uint64) + np.uint64(seed)) * np.uint64(0x9E3779B97F4A7C15)
+    return (h >> np.uint64(11)).astype(np.float64) / 2.0 ** 53 < test_size
+
+
+def _stream(source, features, target, prepare, chunksize, usecols):
+    """(positions, X, y) per chunk, after prepare() and dropping rows with missing values."""
+    start = 0
+    for chunk in iter_chunks(source, chunksize, usecols):
+        chunk.index = pd.RangeIndex(start, start + len(chunk))  # prepare() must keep these labels
+        start += len(chunk)
+        if prepare is not None:
+            chunk = prepare(chunk)
+        chunk = chunk.dropna(subset=[*features, target])
+        yield chunk.index.to_numpy(), chunk[features].astype(np.float64), chunk[target].to_numpy()
+
+
+def train_streaming(source, features, target, prepare=None, epochs: int = 5, chunksize: int = 100_000,
+                    test_size: float = 0.2, random_state: int = 42, alpha: float = 1e-4, usecols=None):
+    """
+    Fit Pipeline(StandardScaler, SGDClassifier(log_loss)) without loading the whole source.
+    prepare(chunk) -> chunk may add/encode columns (it must not reset the index);
+    usecols defaults to features + [target]. Rows selected by holdout_mask(test_size) are
+    never trained on; evaluate_streaming() scores exactly those rows.
+    """
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.linear_model import SGDClassifier
+
+    features = list(features)
+    usecols = usecols or [*features, target]
+    stream = lambda: _stream(source, features, target, prepare, chunksize, usecols)
+
+    scaler, classes = StandardScaler(), set()
+    for pos, X, y in stream():
+        train = ~holdout_mask(pos, test_size, random_state)
+        if train.any():
+            scaler.partial_fit(X[train])
+            classes.update(np.unique(y[train]).tolist())
+
+    clf = SGDClassifier(loss="log_loss", alpha=alpha, random_state=random_state)
+    classes = np.array(sorted(classes))
+    rng = np.random.default_rng(random_state)
+    for _ in range(epochs):
+        for pos, X, y in stream():
+            idx = np.flatnonzero(~holdout_mask(pos, test_size, random_state))
+            if len(idx):
+                idx = rng.permutation(idx)
+                clf.partial_fit(scaler.transform(X.iloc[idx]), y[idx], classes=classes)
+
+    return Pipeline(steps=[("scaler", scaler), ("clf", clf)])
+
+
+class StreamingMetrics:
+    """Classification metrics accumulated over chunks of (y_true, y_pred[, y_prob])."""
+
+    def __init__(self, classes):
+        self.classes = np.asarray(classes)
+        self.confusion = np.zeros((len(self.classes), len(self.classes)), dtype=np.int64)
+        self._curve = ChunkedEvaluator(decimals=6) if len(self.classes) == 2 else None
+        self._scored = 0   # rows fed to the ROC curve
+
+    def update(self, y_true, y_pred, y_prob=None):
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+        unknown = np.union1d(y_true[~np.isin(y_true, self.classes)], y_pred[~np.isin(y_pred, self.classes)])
+        if unknown.size:
+            raise ValueError(f"Labels {unknown.tolist()} are not among the classes {self.classes.tolist()}")
+        k = len(self.classes)
+        t = np.searchsorted(self.classes, y_true)
+        p = np.searchsorted(self.classes, y_pred)
+        self.confusion += np.bincount(t * k + p, minlength=k * k).reshape(k, k)
+        if self._curve is not None and y_prob is not None and len(y_true):
+            self._curve.update(y_true == self.classes[1], y_prob)
+            self._scored += len(y_true)
+
+    def report(self) -> dict:
+        cm = self.confusion
+        tp = np.diag(cm).astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.nan_to_num(tp / cm.sum(axis=0))
+            recall = np.nan_to_num(tp / cm.sum(axis=1))
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+        result = {
+            "rows": int(cm.sum()),
+            "accuracy": tp.sum() / max(cm.sum(), 1),
+            "confusion": cm,
+            "per_class": pd.DataFrame({"precision": precision, "recall": recall, "f1": f1,
+                                       "support": cm.sum(axis=1)}, index=self.classes),
+        }
+        if self._curve is not None and self._scored:
+            result["roc_auc"] = self._curve.result().roc_auc
+        return result
+
+
+def evaluate_streaming(model, source, features, target, prepare=None, chunksize: int = 100_000,
+                       test_size: float = 0.2, random_state: int = 42, usecols=None) -> dict:
+    """Score the held-out rows of a train_streaming() split (test_size=1.0: every row)."""
+    features = list(features)
+    usecols = usecols or [*features, target]
+    metrics = StreamingMetrics(model.classes_)
+    for pos, X, y in _stream(source, features, target, prepare, chunksize, usecols):
+        test = np.flatnonzero(holdout_mask(pos, test_size, random_state))
+        if len(test):
+            proba = model.predict_proba(X.iloc[test])
+            y_pred = model.classes_[proba.argmax(axis=1)]
+            metrics.update(y[test], y_pred, proba[:, 1] if proba.shape[1] == 2 else None)
+    return metrics.report()
+
+
+def run_stream_script(csv_path, features, target, mappings: dict = None,
+                      predict_path=None, predict_title: str = "Predictions:"):
+    """
+    Out-of-core run for the DEC23 Titanic scripts' --stream flag: an online scaler +
+    logistic model updated one chunk at a time, scored on a 20% hold-out, printed in the
+    scripts' format. mappings ({column: {value: code}}) encodes categorical features per
+    chunk; with predict_path, the predictions for that file are printed as well, one per
+    row of the file (NaN where a feature is missing).
+    """
+    features = list(features)
+    prepare = None
+    if mappings:
+        prepare = lambda chunk: chunk.assign(**{c: chunk[c].map(m) for c, m in mappings.items()})
+
+    model = train_streaming(csv_path, features, target, prepare=prepare)
+    report = evaluate_streaming(model, csv_path, features, target, prepare=prepare)
+    if report["rows"]:
+        print(f'Model Accuracy: {report["accuracy"]:.2f}')
+        print('\nConfusion Matrix:')
+        print(report['confusion'])
+        print('\nClassification Report:')
+        print(report['per_class'].round(2))
+    else:
+        print('No held-out rows to evaluate (the file is too small for a 20% hold-out)')
+
+    if predict_path is not None:
+        predictions = []
+        for chunk in iter_chunks(predict_path, columns=features):
+            chunk = prepare(chunk) if prepare else chunk
+            complete = chunk[features].notna().all(axis=1).to_numpy()
+            found = model.predict(chunk.loc[complete, features]) if complete.any() else np.array([])
+            # Rows with a missing feature stay in place as NaN, so row i is the file's row i
+            labels = np.full(len(chunk), np.nan, dtype=np.float64 if found.dtype.kind in "biuf" else object)
+            labels[complete] = found
+            predictions.append(labels)
+        print(f"\n{predict_title}")
+        print(np.concatenate(predictions) if predictions else np.array([]))
+    return model, report
+
+
+def _write_demo_csv(path: str, rows: int, n_features: int = 20, chunk: int = 100_000):
+    rng = np.random.default_rng(0)
+    w = rng.normal(size=n_features)
+    scale, offset = rng.uniform(0.5, 20, n_features), rng.normal(0, 5, n_features)
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        Z = rng.normal(size=(n, n_features))
+        X = Z * scale + offset
+        z = Z @ w
+        df = pd.DataFrame(X, columns=[f"x{i}" for i in range(n_features)])
+        df["y"] = (rng.random(n) < 1 / (1 + np.exp(-z))).astype(int)
+        df.to_csv(path, mode="a" if start else "w", header=not start, index=False)
+    return [f"x{i}" for i in range(n_features)], "y"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core logistic regression on a CSV or Parquet file.")
+    parser.add_argument("source", nargs="?", help="CSV or Parquet file")
+    parser.add_argument("--target")
+    parser.add_argument("--features", nargs="+")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--demo", type=int, metavar="ROWS", help="generate a synthetic CSV with this many rows")
+    args = parser.parse_args()
+
+    import time
+    import resource
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.demo:
+            source = os.path.join(tmp, "demo.csv")
+            features, target = _write_demo_csv(source, args.demo)
+            print(f"Demo CSV: {args.demo:,} rows, {os.path.getsize(source) / 1e6:,.0f} MB")
+        elif args.source and args.target and args.features:
+            source, features, target = args.source, args.features, args.target
+        else:
+            parser.error("give a source with --target and --features, or --demo ROWS")
+
+        t0 = time.perf_counter()
+        model = train_streaming(source, features, target, epochs=args.epochs,
+                                chunksize=args.chunksize, test_size=args.test_size)
+        report = evaluate_streaming(model, source, features, target,
+                                    chunksize=args.chunksize, test_size=args.test_size)
+
+    print(f"Trained {args.epochs} epoch(s) in {time.perf_counter() - t0:.1f} s; "
+          f"evaluated {report['rows']:,} held-out rows")
+    print(f"  Accuracy: {report['accuracy']:.4f}")
+    if "roc_auc" in report:
+        print(f"  ROC-AUC : {report['roc_auc']:.4f}")
+    print(report["per_class"].round(4).to_string())
+    print(f"Peak memory (max RSS): {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Parity tests: the compiled models must return sklearn's predict_proba.
+
+Usage:
+  python -m pytest -q test_compiled_model.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from BreastCancerPredictiveAnalytics import load_data, make_models
+from compiled_model import COMPILED_KINDS, compile_model
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    X, y, _ = load_data()
+    models = make_models(params={"RandomForest": {"n_estimators": 50}})
+    for model in models.values():
+        model.fit(X, y)
+    # Rows outside the training range too, so extreme leaves and logits are covered
+    rng = np.random.default_rng(0)
+    X_eval = np.vstack([X.to_numpy(), X.to_numpy()[rng.integers(0, len(X), 200)] * rng.uniform(0.5, 2.0, (200, 1))])
+    return models, X.columns, X_eval
+
+
+@pytest.mark.parametrize("name", ["RandomForest", "LogisticRegression"])
+def test_predict_proba_matches_sklearn(fitted, name):
+    models, columns, X_eval = fitted
+    expected = models[name].predict_proba(pd.DataFrame(X_eval, columns=columns))
+    np.testing.assert_allclose(compile_model(models[name]).predict_proba(X_eval), expected, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("name", ["RandomForest", "LogisticRegression"])
+def test_round_trip_through_arrays(fitted, name):
+    models, _, X_eval = fitted
+    compiled = compile_model(models[name])
+    restored = COMPILED_KINDS[compiled.kind].from_arrays(compiled.arrays, compiled.params)
+    np.testing.assert_array_equal(restored.predict_proba(X_eval), compiled.predict_proba(X_eval))
+
+
+@pytest.mark.parametrize("name", ["RandomForest", "LogisticRegression"])
+def test_rejects_multiclass_and_multi_output(fitted, name):
+    _, columns, X_eval = fitted
+    X = pd.DataFrame(X_eval[:300], columns=columns)
+    three = np.arange(len(X)) % 3
+    with pytest.raises(ValueError, match="binary"):
+        compile_model(make_models(params={"RandomForest": {"n_estimators": 5}})[name].fit(X, three))
+    if name == "RandomForest":
+        two_outputs = np.column_stack([three % 2, three // 2])
+        with pytest.raises(ValueError, match="binary"):
+            compile_model(make_models(params={"RandomForest": {"n_estimators": 5}})[name].fit(X, two_outputs))
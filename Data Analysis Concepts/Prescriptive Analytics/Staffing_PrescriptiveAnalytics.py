@@ -13,22 +13,39 @@ This model recommends an action (how many servers to schedule in each shift) by
 an optimization problem that balances cost against service capacity requirements.
 """
 
+from __future__ import annotations
+
 import os
+import sys
 import math
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Heavy libraries are imported on first use (../lazy_imports.py), so a --no-figures
+# run never loads matplotlib
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from lazy_imports import is_available, lazy_import, report_import_times
 
-# Built-in dataset
-import seaborn as sns
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+
+# Built-in dataset, served offline from the shared columnar cache (../dataset_cache.py)
+dataset_cache = lazy_import("dataset_cache")
+# Shared render scheduler (../figure_cache.py)
+figure_cache = lazy_import("figure_cache")
 
 # Optimization
-try:
-    import pulp
-except ImportError as e:
+if not is_available("pulp"):
     raise SystemExit(
         "This script requires 'pulp'. Install it with:\n\n  pip install pulp\n"
-    ) from e
+    )
+pulp = lazy_import("pulp")
+
+# Sparse matrices + HiGHS for the array-backed builder (only needed at production scale)
+HAVE_SCIPY = is_available("scipy")
+sparse = lazy_import("scipy.sparse")
+optimize = lazy_import("scipy.optimize")
 
 
 # -------------------------
@@ -43,6 +60,18 @@ SAFETY_FACTOR = 1.15          # buffer on demand to protect service level
 WAGE_PER_SERVER_LUNCH = 55.0  # £ per lunch shift
 WAGE_PER_SERVER_DINNER = 65.0 # £ per dinner shift
 
+# Optional coupling constraints (None = not enforced). Either one links shifts together,
+# so the per-shift closed form no longer applies and the model goes to CBC.
+WEEKLY_BUDGET = None          # £ cap on total weekly wage cost
+MAX_WEEKLY_SERVERS = None     # cap on total server-shifts per week
+
+# What-if grid for the scenario sweep (capacity x safety factor x lunch wage x dinner wage);
+# plain tuples, so importing the module does not load numpy
+SWEEP_CAPACITIES = tuple(range(6, 21))                                       # parties/server/shift
+SWEEP_SAFETY_FACTORS = tuple(round(1.00 + 0.05 * i, 2) for i in range(11))  # demand buffer, 1.00-1.50
+SWEEP_WAGES_LUNCH = tuple(40.0 + 2.5 * i for i in range(17))                 # £ per lunch shift, 40-80
+SWEEP_WAGES_DINNER = tuple(50.0 + 2.5 * i for i in range(17))                # £ per dinner shift, 50-90
+
 
 def ensure_dir(path="downloads"):
     os.makedirs(path, exist_ok=True)
@@ -50,73 +79,464 @@ def ensure_dir(path="downloads"):
 
 
 def load_and_prepare():
-    df = sns.load_dataset("tips")
+    df = dataset_cache.load_dataset("tips", columns=["day", "time"])
     # We treat each row as one "party" that came in.
     # Encode ordered categories for clean display
     df["day"] = pd.Categorical(df["day"], categories=DAY_ORDER, ordered=True)
     df["time"] = pd.Categorical(df["time"], categories=TIME_ORDER, ordered=True)
     # Demand per shift = number of parties observed in dataset for that (day,time)
-    demand = (
-        df.groupby(["day", "time"])
-          .size()
-          .rename("parties")
-          .reset_index()
-          .pivot(index="day", columns="time", values="parties")
-          .fillna(0)
-          .reindex(index=DAY_ORDER, columns=TIME_ORDER)
-    )
+    demand = demand_pivot(df.groupby(["day", "time"]).size())
     return df, demand
 
 
-def build_and_solve_lp(demand: pd.DataFrame):
-    days = list(demand.index)
-    times = list(demand.columns)
+def demand_pivot(counts: pd.Series):
+    """Turn party counts indexed by (day, time) into the day x time demand frame the LP uses."""
+    return (
+        counts.rename("parties")
+              .reset_index()
+              .pivot(index="day", columns="time", values="parties")
+              .reindex(index=DAY_ORDER, columns=TIME_ORDER)
+              .fillna(0)
+              .astype("int64")
+    )
+
+
+def load_demand_streaming(path, day_col="day", time_col="time", chunksize=500_000,
+                          derive=None, usecols=None, **read_kws):
+    """
+    Build the demand frame from a (possibly multi-GB) transaction log without loading it.
 
-    # Decision variables: integer servers[day,time] >= 0
-    model = pulp.LpProblem("StaffingOptimization", pulp.LpMinimize)
-    servers = pulp.LpVariable.dicts(
-        "servers",
-        ((d, t) for d in days for t in times),
-        lowBound=0,
-        cat=pulp.LpInteger
+    Reads the CSV in chunks, projecting only the columns needed, and folds each chunk's
+    (day, time) party counts into a running total, so memory is bounded by chunksize
+    plus the handful of distinct shifts. Each row counts as one party, as in
+    load_and_prepare().
+
+    For exports without ready-made day/time columns, pass derive(chunk) -> DataFrame with
+    'day' and 'time' columns (e.g. from a timestamp), and usecols for the raw columns it needs.
+    Without derive, day_col and time_col are read in addition to any usecols given.
+    """
+    if derive is None:
+        keys = (day_col, time_col)
+        if usecols is None:
+            usecols = list(keys)
+        elif callable(usecols):
+            usecols = lambda col, wanted=usecols: col in keys or wanted(col)
+        else:
+            usecols = [*usecols, *(c for c in keys if c not in usecols)]
+        read_kws.setdefault("dtype", "category")
+    counts = None
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize, **read_kws):
+        if derive is not None:
+            chunk = derive(chunk)
+            day_col, time_col = "day", "time"
+        part = chunk.groupby([day_col, time_col], observed=True).size()
+        counts = part if counts is None else counts.add(part, fill_value=0)
+
+    if counts is None:
+        counts = pd.Series([], index=pd.MultiIndex.from_tuples([], names=["day", "time"]), dtype=float)
+
+    # Same shape as the in-memory path: only known days/times, as ordered categoricals
+    days = counts.index.get_level_values(0).astype(str)
+    times = counts.index.get_level_values(1).astype(str)
+    keep = days.isin(DAY_ORDER) & times.isin(TIME_ORDER)
+    counts = counts[keep]
+    counts.index = pd.MultiIndex.from_arrays(
+        [pd.Categorical(days[keep], categories=DAY_ORDER, ordered=True),
+         pd.Categorical(times[keep], categories=TIME_ORDER, ordered=True)],
+        names=["day", "time"],
     )
+    # Every shift, with 0 for those no chunk saw, so the frame stays integer like the in-memory one
+    grid = pd.MultiIndex.from_product(
+        [pd.CategoricalIndex(DAY_ORDER, categories=DAY_ORDER, ordered=True),
+         pd.CategoricalIndex(TIME_ORDER, categories=TIME_ORDER, ordered=True)],
+        names=["day", "time"],
+    )
+    return demand_pivot(counts.reindex(grid, fill_value=0).astype("int64"))
+
+
+def analyze_structure(model: pulp.LpProblem):
+    """
+    Inspect which variables each constraint touches.
+    A model is separable when every constraint involves a single variable: each variable
+    can then be optimised on its own from its bounds, with no solver needed.
+    """
+    coupling = [name for name, c in model.constraints.items() if len(c) > 1]
+    return {"separable": not coupling, "coupling": coupling}
+
+
+def solve_separable(model: pulp.LpProblem, tol: float = 1e-9):
+    """
+    Closed-form solve of a separable model.
+    Single-variable constraints become per-variable bounds (vectorised with NumPy), and
+    each variable sits at the bound its objective coefficient pushes it towards
+    (rounded inwards for integers). Writes values back onto the PuLP variables and
+    returns True, or returns False if the model is unbounded/infeasible so the caller
+    can hand it to a real solver.
+    """
+    variables = model.variables()
+    pos = {v.name: i for i, v in enumerate(variables)}
+    n = len(variables)
+
+    lb = np.array([-np.inf if v.lowBound is None else v.lowBound for v in variables], dtype=float)
+    ub = np.array([np.inf if v.upBound is None else v.upBound for v in variables], dtype=float)
+    is_int = np.array([v.cat == pulp.LpInteger for v in variables])
+    cost = np.zeros(n)
+    for v, coef in model.objective.items():
+        cost[pos[v.name]] = coef
+
+    # One row per constraint: coef * x  (sense)  rhs
+    rows = [(pos[v.name], coef, -c.constant, c.sense)
+            for c in model.constraints.values() for v, coef in c.items()]
+    idx, coef, rhs, sense = (np.array(col, dtype=float) for col in zip(*rows)) if rows else [np.empty(0)] * 4
+    row_lo = np.where(sense >= 0, rhs, -np.inf)
+    row_hi = np.where(sense <= 0, rhs, np.inf)
+
+    x = _closed_form(cost, lb, ub, is_int, idx.astype(int), coef, row_lo, row_hi, tol)
+    if x is None:
+        return False
+
+    for v, value in zip(variables, x):
+        v.varValue = value
+    model.status = pulp.LpStatusOptimal
+    return True
+
+
+def _closed_form(cost, lb, ub, is_int, idx, coef, row_lo, row_hi, tol=1e-9):
+    """
+    Shared kernel for separable models: rows  row_lo <= coef * x[idx] <= row_hi  are folded
+    into variable bounds, then each variable takes the bound its cost favours.
+    Returns the solution vector, or None if unbounded/infeasible.
+    """
+    lb, ub = lb.astype(float), ub.astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lo, hi = row_lo / coef, row_hi / coef
+    lo, hi = np.where(coef > 0, lo, hi), np.where(coef > 0, hi, lo)
+    np.maximum.at(lb, idx, lo)
+    np.minimum.at(ub, idx, hi)
+
+    lb = np.where(is_int, np.ceil(lb - tol), lb)
+    ub = np.where(is_int, np.floor(ub + tol), ub)
+    x = np.where(cost > 0, lb, np.where(cost < 0, ub, np.where(np.isfinite(lb), lb, np.clip(0, lb, ub))))
+    if not np.all(np.isfinite(x)) or np.any(lb > ub):
+        return None
+    return x
+
+
+class StaffingPlanner:
+    """
+    Persistent staffing model: variables and constraints are built once, then demand
+    and wages are pushed into the existing constraint right-hand sides and objective
+    coefficients before each re-solve. CBC re-solves are warm-started from the previous
+    plan; separable models skip CBC entirely (see solve_separable).
+    """
+
+    def __init__(self, days=DAY_ORDER, times=TIME_ORDER, capacity=CAPACITY_PER_SERVER,
+                 weekly_budget=WEEKLY_BUDGET, max_weekly_servers=MAX_WEEKLY_SERVERS, wages=None):
+        self.days = list(days)
+        self.times = list(times)
+        self.capacity = capacity
+        self.weekly_budget = weekly_budget
+
+        # Wage per server for each time of day (wages={time: £} overrides/extends the defaults)
+        wages = {"Lunch": WAGE_PER_SERVER_LUNCH, "Dinner": WAGE_PER_SERVER_DINNER, **(wages or {})}
+        missing = [t for t in self.times if t not in wages]
+        if missing:
+            raise ValueError(f"No wage for time(s) {missing}; pass wages={{time: wage}}")
+        self.base_wage = {t: float(wages[t]) for t in self.times}
+        self.wage = dict(self.base_wage)
+
+        # Decision variables: integer servers[day,time] >= 0
+        self.model = pulp.LpProblem("StaffingOptimization", pulp.LpMinimize)
+        self.servers = pulp.LpVariable.dicts(
+            "servers",
+            ((d, t) for d in self.days for t in self.times),
+            lowBound=0,
+            cat=pulp.LpInteger
+        )
+        model, servers = self.model, self.servers
+
+        # Objective: minimize total wage cost (coefficients refreshed by update())
+        model += self._wage_expr()
+
+        # Capacity constraints: servers * capacity >= safety * demand (rhs set by update())
+        # Min staffing: servers >= 1 if there is any demand (rhs toggled 0/1 by update())
+        for d in self.days:
+            for t in self.times:
+                model += servers[(d, t)] * capacity >= 0, f"capacity_{d}_{t}"
+                model += servers[(d, t)] >= 0, f"min_staff_{d}_{t}"
+
+        # Optional coupling constraints across shifts
+        if weekly_budget is not None:
+            model += self._wage_expr() <= weekly_budget, "weekly_budget"
+        if max_weekly_servers is not None:
+            model += pulp.lpSum(servers.values()) <= max_weekly_servers, "max_weekly_servers"
+
+    def _wage_expr(self):
+        return pulp.lpSum(self.wage[t] * self.servers[(d, t)] for d in self.days for t in self.times)
+
+    def update(self, demand: pd.DataFrame = None, wage_lunch=None, wage_dinner=None,
+               safety_factor=None, wages=None):
+        """
+        Change demand and/or wages in place; returns self so calls can be chained.
+        safety_factor (default SAFETY_FACTOR) scales the demand it is passed with, so it
+        needs demand. wages={time: £} sets any time of day; wage_lunch/wage_dinner are
+        shorthands for the Lunch/Dinner entries.
+        """
+        if safety_factor is not None and demand is None:
+            raise ValueError("safety_factor applies to demand: pass both together")
+        if safety_factor is None:
+            safety_factor = SAFETY_FACTOR
+        wages = dict(wages or {})
+        if wage_lunch is not None:
+            wages["Lunch"] = wage_lunch
+        if wage_dinner is not None:
+            wages["Dinner"] = wage_dinner
+        unknown = [t for t in wages if t not in self.wage]
+        if unknown:
+            raise ValueError(f"Wage given for time(s) {unknown} not in the model's times {self.times}")
+
+        constraints = self.model.constraints
+        if demand is not None:
+            for d in self.days:
+                for t in self.times:
+                    parties = float(demand.loc[d, t])
+                    constraints[f"capacity_{d}_{t}"].changeRHS(safety_factor * parties)
+                    constraints[f"min_staff_{d}_{t}"].changeRHS(1 if parties > 0 else 0)
+
+        if wages:
+            self.wage.update({t: float(w) for t, w in wages.items()})
+            for (d, t), var in self.servers.items():
+                self.model.objective[var] = self.wage[t]
+            if self.weekly_budget is not None:
+                # Budget row shares the wage coefficients: swap in a fresh row
+                del constraints["weekly_budget"]
+                self.model += self._wage_expr() <= self.weekly_budget, "weekly_budget"
+        return self
+
+    def reset(self):
+        """Back to no demand and the wages the planner was built with."""
+        empty = pd.DataFrame(0.0, index=self.days, columns=self.times)
+        return self.update(empty, wages=self.base_wage)
+
+    def solve(self):
+        """Solve the current model; returns (servers pivot, total wage cost)."""
+        model, servers = self.model, self.servers
+        days, times = self.days, self.times
+
+        # Closed form when every shift is independent, warm-started CBC otherwise
+        if not (analyze_structure(model)["separable"] and solve_separable(model)):
+            model.solve(pulp.PULP_CBC_CMD(msg=False, warmStart=True))
+        if model.status != pulp.LpStatusOptimal:
+            raise RuntimeError(f"Staffing model not solved to optimality: {pulp.LpStatus[model.status]}")
+
+        # Collect solution
+        sol = pd.DataFrame(
+            {(d, t): [int(round(servers[(d, t)].value()))] for d in days for t in times},
+            index=["servers"]
+        ).T.reset_index()
+        sol.columns = ["day", "time", "servers"]
+        sol = sol.pivot(index="day", columns="time", values="servers").reindex(index=days, columns=times)
+
+        total_cost = 0.0
+        for d in days:
+            for t in times:
+                total_cost += self.wage[t] * sol.loc[d, t]
+
+        return sol, total_cost
+
+
+def build_and_solve_lp(demand: pd.DataFrame, weekly_budget=WEEKLY_BUDGET,
+                       max_weekly_servers=MAX_WEEKLY_SERVERS):
+    planner = StaffingPlanner(demand.index, demand.columns, weekly_budget=weekly_budget,
+                              max_weekly_servers=max_weekly_servers)
+    return planner.update(demand).solve()
+
+
+# Worker-side planner for solve_scenarios(): one model per process, reused across tasks
+_worker_planner = None
+
+
+def _init_worker(planner_kwargs):
+    global _worker_planner
+    _worker_planner = StaffingPlanner(**planner_kwargs)
+
+
+def _solve_in_worker(scenario):
+    # Reset first, so nothing a scenario leaves out leaks in from the worker's previous task
+    return _worker_planner.reset().update(**scenario).solve()
+
+
+def solve_scenarios(scenarios, max_workers=None, **planner_kwargs):
+    """
+    Re-plan many independent scenarios (e.g. one per site) across a process pool.
+    Each scenario is a dict of StaffingPlanner.update() arguments
+    (demand, wage_lunch, wage_dinner, wages, safety_factor); demand is required, wages
+    not given are the planner's base wages. Every worker builds the model once and
+    re-solves it in place for each scenario it receives.
+    Returns a list of (servers pivot, total wage cost) in scenario order.
+    """
+    scenarios = list(scenarios)
+    for i, scenario in enumerate(scenarios):
+        if scenario.get("demand") is None:
+            raise ValueError(f"Scenario {i} has no demand")
+    chunksize = max(1, len(scenarios) // (4 * (max_workers or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(planner_kwargs,)) as pool:
+        return list(pool.map(_solve_in_worker, scenarios, chunksize=chunksize))
+
 
-    # Costs per shift
-    wage = {(d, "Lunch"): WAGE_PER_SERVER_LUNCH for d in days}
-    wage.update({(d, "Dinner"): WAGE_PER_SERVER_DINNER for d in days})
+# -------------------------
+# Array-backed builder (hourly buckets, many sites)
+# -------------------------
+def build_array_model(demand: pd.DataFrame, wages, capacity=CAPACITY_PER_SERVER,
+                      safety_factor=SAFETY_FACTOR, weekly_budget=None,
+                      max_weekly_servers=None, group_by=None):
+    """
+    Build the staffing model straight from a demand pivot as sparse arrays, in one step.
+
+    - demand: any 2-D pivot, e.g. rows = (site, week, day), columns = hourly buckets
+    - wages: scalar, one value per column, or a frame shaped like demand
+    - weekly_budget / max_weekly_servers: optional coupling caps, applied per group of
+      rows given by the index level(s) in group_by (None = one cap over the whole model)
 
-    # Objective: minimize total wage cost
-    model += pulp.lpSum(wage[(d, t)] * servers[(d, t)] for d in days for t in times)
+    Variables are the flattened demand cells. Returns a dict with the objective c, the
+    CSR constraint matrix A with row bounds (row_lo <= A @ x <= row_hi), variable bounds
+    and the index/columns needed to reshape the solution.
+    """
+    if not HAVE_SCIPY:
+        raise SystemExit("The array-backed builder requires 'scipy'. Install it with:\n\n  pip install scipy\n")
+
+    n_rows, n_cols = demand.shape
+    dem = demand.to_numpy(dtype=float).ravel()
+    n = dem.size
+    if isinstance(wages, pd.Series):
+        wages = wages.reindex(demand.columns).to_numpy(dtype=float)
+    cost = np.broadcast_to(np.asarray(wages, dtype=float), demand.shape).ravel().copy()
+
+    # Capacity rows: capacity * servers >= safety * demand (one nonzero per row)
+    var = np.arange(n)
+    blocks = [sparse.csr_matrix((np.full(n, float(capacity)), (var, var)), shape=(n, n))]
+    row_lo = [safety_factor * dem]
+    row_hi = [np.full(n, np.inf)]
+
+    # Coupling rows: one per group, summing over every cell in the group
+    if weekly_budget is not None or max_weekly_servers is not None:
+        if group_by is None:
+            codes = np.zeros(n_rows, dtype=int)
+        else:
+            codes = demand.groupby(level=group_by, sort=False).ngroup().to_numpy()
+        codes = np.repeat(codes, n_cols)
+        n_groups = codes.max() + 1
+        for weights, cap in ((cost, weekly_budget), (np.ones(n), max_weekly_servers)):
+            if cap is None:
+                continue
+            blocks.append(sparse.csr_matrix((weights, (codes, var)), shape=(n_groups, n)))
+            row_lo.append(np.full(n_groups, -np.inf))
+            row_hi.append(np.broadcast_to(np.asarray(cap, dtype=float), n_groups))
+
+    return {
+        "c": cost,
+        "A": sparse.vstack(blocks, format="csr"),
+        "row_lo": np.concatenate(row_lo),
+        "row_hi": np.concatenate(row_hi),
+        "lb": (dem > 0).astype(float),   # at least 1 server if there is any demand
+        "ub": np.full(n, np.inf),
+        "index": demand.index,
+        "columns": demand.columns,
+    }
+
+
+def solve_array_model(model: dict):
+    """
+    Solve a model from build_array_model().
+    Rows with a single nonzero are folded into bounds and solved in closed form; if any
+    row couples several variables the whole matrix goes to HiGHS (scipy.optimize.milp).
+    Returns (servers pivot, total wage cost).
+    """
+    A, c = model["A"], model["c"]
+    nnz = np.diff(A.indptr)
+    x = None
+    if np.all(nnz <= 1):
+        single = nnz == 1
+        x = _closed_form(c, model["lb"], model["ub"], np.ones(c.size, dtype=bool),
+                         A.indices, A.data, model["row_lo"][single], model["row_hi"][single])
+    if x is None:
+        res = optimize.milp(c, integrality=np.ones(c.size),
+                            bounds=optimize.Bounds(model["lb"], model["ub"]),
+                            constraints=optimize.LinearConstraint(A, model["row_lo"], model["row_hi"]))
+        if not res.success:
+            raise RuntimeError(f"Staffing model not solved to optimality: {res.message}")
+        x = np.round(res.x)
+
+    sol = pd.DataFrame(x.reshape(len(model["index"]), len(model["columns"])).astype(int),
+                       index=model["index"], columns=model["columns"])
+    return sol, float(c @ x)
 
-    # Capacity constraints: servers * capacity >= SAFETY_FACTOR * demand
-    for d in days:
-        for t in times:
-            req = SAFETY_FACTOR * float(demand.loc[d, t])
-            model += servers[(d, t)] * CAPACITY_PER_SERVER >= req, f"capacity_{d}_{t}"
 
-    # Optional: ensure at least 1 server if there is any demand (open shift)
-    for d in days:
-        for t in times:
-            if demand.loc[d, t] > 0:
-                model += servers[(d, t)] >= 1, f"min_staff_{d}_{t}"
+# -------------------------
+# Scenario sweep
+# -------------------------
+def scenario_sweep(
+    demand: pd.DataFrame,
+    capacities=SWEEP_CAPACITIES,
+    safety_factors=SWEEP_SAFETY_FACTORS,
+    wages_lunch=SWEEP_WAGES_LUNCH,
+    wages_dinner=SWEEP_WAGES_DINNER,
+    tol: float = 1e-9,
+):
+    """
+    Evaluate every (capacity, safety factor, lunch wage, dinner wage) scenario in one
+    broadcast NumPy pass instead of looping over scenarios in Python.
 
-    # Solve
-    _ = model.solve(pulp.PULP_CBC_CMD(msg=False))
+    Per shift the optimal plan is servers = ceil(safety * demand / capacity), with at
+    least one server whenever there is demand (same rule the LP enforces). Server counts
+    do not depend on wages, so they are computed once per (capacity, safety factor) and
+    the wage axes are broadcast on top of the lunch/dinner totals.
 
-    # Collect solution
-    sol = pd.DataFrame(
-        {(d, t): [int(servers[(d, t)].value())] for d in days for t in times},
-        index=["servers"]
-    ).T.reset_index()
-    sol.columns = ["day", "time", "servers"]
-    sol = sol.pivot(index="day", columns="time", values="servers").reindex(index=days, columns=times)
+    Like _closed_form(), ratios within tol of an integer are not rounded up, so float noise
+    (12.000000001) never adds a server.
 
-    total_cost = 0.0
-    for d in days:
-        for t in times:
-            total_cost += wage[(d, t)] * sol.loc[d, t]
+    Every axis always includes the base assumption (CAPACITY_PER_SERVER, SAFETY_FACTOR,
+    WAGE_PER_SERVER_*), so the base case can be read back with .xs whatever grid is given.
 
-    return sol, total_cost
+    Returns two tidy, MultiIndexed Series that can be sliced with .loc / .xs:
+    - servers_cube: index (capacity, safety_factor, day, time) -> servers
+    - cost_cube:    index (capacity, safety_factor, wage_lunch, wage_dinner) -> total cost
+    """
+    capacities = np.union1d(np.asarray(capacities, dtype=float), [CAPACITY_PER_SERVER])
+    safety_factors = np.union1d(np.asarray(safety_factors, dtype=float), [SAFETY_FACTOR])
+    wages_lunch = np.union1d(np.asarray(wages_lunch, dtype=float), [WAGE_PER_SERVER_LUNCH])
+    wages_dinner = np.union1d(np.asarray(wages_dinner, dtype=float), [WAGE_PER_SERVER_DINNER])
+
+    dem = demand.reindex(columns=TIME_ORDER).to_numpy(dtype=float)  # (day, time)
+
+    # (capacity, safety, day, time)
+    req = safety_factors[None, :, None, None] * dem[None, None, :, :]
+    servers = np.ceil(req / capacities[:, None, None, None] - tol)
+    servers = np.maximum(servers, (dem > 0)[None, None, :, :])
+
+    # Lunch / dinner server totals per (capacity, safety), then broadcast the wage axes
+    per_time = servers.sum(axis=2)                                    # (capacity, safety, time)
+    cost = (per_time[:, :, 0, None, None] * wages_lunch[None, None, :, None]
+            + per_time[:, :, 1, None, None] * wages_dinner[None, None, None, :])
+
+    servers_cube = pd.Series(
+        servers.astype(int).ravel(),
+        index=pd.MultiIndex.from_product(
+            [capacities, safety_factors, demand.index, TIME_ORDER],
+            names=["capacity", "safety_factor", "day", "time"],
+        ),
+        name="servers",
+    )
+    cost_cube = pd.Series(
+        cost.ravel(),
+        index=pd.MultiIndex.from_product(
+            [capacities, safety_factors, wages_lunch, wages_dinner],
+            names=["capacity", "safety_factor", "wage_lunch", "wage_dinner"],
+        ),
+        name="total_cost",
+    )
+    return servers_cube, cost_cube
 
 
 # -------------------------
@@ -209,28 +629,17 @@ def fig4_utilization_heatmap(demand: pd.DataFrame, servers: pd.DataFrame, outdir
     return path
 
 
-def fig5_cost_sensitivity(demand: pd.DataFrame, servers: pd.DataFrame, outdir: str):
+def fig5_cost_sensitivity(cost_cube: pd.Series, outdir: str):
     """
     Sensitivity of total wage cost to server capacity assumptions.
-    For each capacity value, compute required servers = ceil(required / capacity) and cost.
+    Reads the capacity slice of the scenario cube at the base safety factor and wages.
     """
-    days = demand.index
-    # Wages per shift vector aligned with (day,time)
-    wages = []
-    for d in days:
-        wages.append(WAGE_PER_SERVER_LUNCH)  # Lunch
-        wages.append(WAGE_PER_SERVER_DINNER) # Dinner
-    wages = np.array(wages)
-
-    req = SAFETY_FACTOR * demand.copy()
-    req_vec = np.column_stack([req["Lunch"].values, req["Dinner"].values]).reshape(-1)
-
-    capacities = np.arange(6, 21, 1)  # 6..20 parties/server/shift
-    costs = []
-    for cap in capacities:
-        servers_needed = np.ceil(req_vec / cap)
-        total_cost = (servers_needed * wages).sum()
-        costs.append(total_cost)
+    curve = cost_cube.xs(
+        (SAFETY_FACTOR, WAGE_PER_SERVER_LUNCH, WAGE_PER_SERVER_DINNER),
+        level=["safety_factor", "wage_lunch", "wage_dinner"],
+    )
+    capacities = curve.index.values
+    costs = curve.values
 
     plt.figure(figsize=(8, 5))
     plt.plot(capacities, costs, marker="o")
@@ -247,8 +656,7 @@ def fig5_cost_sensitivity(demand: pd.DataFrame, servers: pd.DataFrame, outdir: s
 # -------------------------
 # Main
 # -------------------------
-def main():
-    outdir = ensure_dir("downloads")
+def main(figures: bool = True):
     df, demand = load_and_prepare()
 
     servers, total_cost = build_and_solve_lp(demand)
@@ -259,18 +667,20 @@ def main():
     print(f"\nTotal wage cost: £{total_cost:,.2f}")
     print(f"Assumptions -> capacity/server: {CAPACITY_PER_SERVER} parties/shift, safety factor: {SAFETY_FACTOR}")
 
-    # Save visuals
-    print("\nSaving visuals locally to:", os.path.abspath(outdir), "\n")
-    saved = []
-    saved.append(fig1_demand_by_shift(demand, outdir))
-    saved.append(fig2_staffing_plan(servers, outdir))
-    saved.append(fig3_capacity_vs_required(demand, servers, outdir))
-    saved.append(fig4_utilization_heatmap(demand, servers, outdir))
-    saved.append(fig5_cost_sensitivity(demand, servers, outdir))
+    # What-if grid
+    _, cost_cube = scenario_sweep(demand)
+    print(f"\n=== What-if grid ({len(cost_cube):,} scenarios) ===")
+    print(f"Total wage cost range: £{cost_cube.min():,.2f} – £{cost_cube.max():,.2f}")
+    by_safety = cost_cube.xs(
+        (CAPACITY_PER_SERVER, WAGE_PER_SERVER_LUNCH, WAGE_PER_SERVER_DINNER),
+        level=["capacity", "wage_lunch", "wage_dinner"],
+    )
+    print("Total wage cost by safety factor (base capacity and wages):")
+    print(by_safety.map(lambda c: f"£{c:,.2f}").to_string())
 
-    print("✅ Visuals saved:")
-    for p in saved:
-        print(" -", os.path.abspath(p))
+    # Save visuals
+    if figures:
+        save_visuals(demand, servers, cost_cube)
 
     # Short explanation of why this is prescriptive
     print("\nWhy prescriptive?")
@@ -279,5 +689,29 @@ def main():
     print("It prescribes an optimal action (staffing levels), not just describing or predicting outcomes.")
 
 
+def save_visuals(demand, servers, cost_cube):
+    outdir = ensure_dir("downloads")
+    print("\nSaving visuals locally to:", os.path.abspath(outdir), "\n")
+    # Rendered in parallel; figures whose inputs are unchanged are reused as-is
+    saved = figure_cache.render_figures([
+        (fig1_demand_by_shift, (demand, outdir)),
+        (fig2_staffing_plan, (servers, outdir)),
+        (fig3_capacity_vs_required, (demand, servers, outdir)),
+        (fig4_utilization_heatmap, (demand, servers, outdir)),
+        (fig5_cost_sensitivity, (cost_cube, outdir)),
+    ], outdir)
+
+    print("✅ Visuals saved:")
+    for p in saved:
+        print(" -", os.path.abspath(p))
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Prescriptive staffing plan from the 'tips' dataset.")
+    parser.add_argument("--no-figures", action="store_true", help="print the plan only (never loads matplotlib)")
+    parser.add_argument("--import-times", action="store_true", help="report how long each heavy import took")
+    args = parser.parse_args()
+
+    main(figures=not args.no_figures)
+    if args.import_times:
+        report_import_times()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Offline, columnar cache for the datasets used by the analytics scripts.
+
+- Drop-in for seaborn.load_dataset(name) that never touches the network
+- load_csv(path) is a drop-in for pd.read_csv(path) on any CSV in the repo (or elsewhere);
+  CSVs under ./datasets/ are cached in ./datasets/.cache, any other CSV in the user cache
+  directory ($XDG_CACHE_HOME or ~/.cache, under dataset_cache/)
+- Source CSVs for named datasets live in ./datasets/ (or seaborn's local data home, if
+  already downloaded)
+- First load parses the CSV once and writes an uncompressed Arrow IPC (Feather) file with
+  integer columns downcast to the smallest type and float columns to float32 where that is
+  lossless (plus categorical dtypes for the named datasets); later loads memory-map that
+  file and read only the requested columns
+- A cache is rebuilt when its source changes: an unchanged size and mtime is trusted,
+  otherwise the source's SHA-256 is compared with the one recorded at build time (so a
+  touched but identical file is not re-parsed)
+
+Usage:
+  python dataset_cache.py tips                      # build the cache ahead of a batch run
+  python dataset_cache.py path/to/data.csv ...      # cache any CSV
+  python dataset_cache.py --all                     # every CSV in the repository
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+DATA_DIR = os.path.join(HERE, "datasets")
+CACHE_DIR = os.path.join(DATA_DIR, ".cache")
+# Caches of CSVs outside DATA_DIR, so reading a file from elsewhere never writes into the repo
+USER_CACHE_DIR = os.path.join(
+    os.path.expanduser(os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache"))), "dataset_cache")
+
+# Arrow IPC needs pyarrow; without it the cache falls back to a pandas pickle
+HAVE_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Same categorical preprocessing seaborn applies when loading these datasets
+CATEGORIES = {
+    "tips": {
+        "day": ["Thur", "Fri", "Sat", "Sun"],
+        "sex": ["Male", "Female"],
+        "smoker": ["Yes", "No"],
+        "time": ["Lunch", "Dinner"],
+    },
+}
+
+
+def _seaborn_data_home():
+    # Resolved by hand so seaborn itself is never imported
+    return os.path.expanduser(os.environ.get("SEABORN_DATA", os.path.join("~", ".cache", "seaborn")))
+
+
+def _cache_path(name, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{name}.feather" if HAVE_ARROW else f"{name}.pkl")
+
+
+def find_source(name):
+    for folder in (DATA_DIR, _seaborn_data_home()):
+        path = os.path.join(folder, f"{name}.csv")
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(
+        f"No local copy of the '{name}' dataset. Put {name}.csv in {DATA_DIR} "
+        "(this loader never downloads)."
+    )
+
+
+# -------------------------
+# Cache files
+# -------------------------
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Smallest integer type per integer column; float32 for float columns that survive it exactly."""
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s.dtype):
+            continue
+        if pd.api.types.is_integer_dtype(s.dtype):
+            df[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s.dtype) and s.dtype != np.float32:
+            values = s.to_numpy()
+            narrow = values.astype(np.float32)
+            with np.errstate(over="ignore", invalid="ignore"):
+                if np.array_equal(narrow.astype(values.dtype), values, equal_nan=True):
+                    df[col] = narrow
+    return df
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _meta_path(path):
+    return f"{path}.json"
+
+
+def _is_fresh(src, path):
+    """True if the cache file at path was built from the current content of src."""
+    try:
+        with open(_meta_path(path)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not os.path.exists(path):
+        return False
+    st = os.stat(src)
+    if meta["size"] != st.st_size:
+        return False
+    if meta["mtime_ns"] == st.st_mtime_ns:
+        return True
+    if meta["sha256"] != _sha256(src):
+        return False
+    meta["mtime_ns"] = st.st_mtime_ns  # touched but identical: remember the new mtime
+    _write_json(_meta_path(path), meta)
+    return True
+
+
+def _write_json(path, obj):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _write_cache(df, src, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    st = os.stat(src)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if HAVE_ARROW:
+        df.to_feather(tmp, compression="uncompressed")  # uncompressed, so reads can memory-map it
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)  # atomic, so concurrent runs never read a half-written file
+    _write_json(_meta_path(path), {"source": os.path.abspath(src), "size": st.st_size,
+                                   "mtime_ns": st.st_mtime_ns, "sha256": _sha256(src)})
+    return path
+
+
+def _read_cache(path, columns=None) -> pd.DataFrame:
+    if HAVE_ARROW:
+        import pyarrow.feather as feather
+        return feather.read_table(path, columns=None if columns is None else list(columns),
+                                  memory_map=True).to_pandas()
+    df = pd.read_pickle(path)
+    return df if columns is None else df[list(columns)]
+
+
+# -------------------------
+# Named example datasets
+# -------------------------
+def build_cache(name, cache_dir=CACHE_DIR):
+    """Parse the source CSV once and write the typed, columnar cache file."""
+    src = find_source(name)
+    df = pd.read_csv(src)
+    # seaborn drops a trailing all-empty row some of its CSVs carry
+    if len(df) and df.iloc[-1].isnull().all():
+        df = df.iloc[:-1]
+    for col, cats in CATEGORIES.get(name, {}).items():
+        df[col] = pd.Categorical(df[col], cats)
+    return _write_cache(downcast(df), src, _cache_path(name, cache_dir))
+
+
+def load_dataset(name, columns=None, cache_dir=CACHE_DIR) -> pd.DataFrame:
+    """
+    Load an example dataset from the local cache, building it from the CSV if needed.
+    columns: optional list of columns to read (others are never loaded from disk).
+    """
+    path = _cache_path(name, cache_dir)
+    try:
+        src = find_source(name)
+    except FileNotFoundError:
+        if not os.path.exists(path):
+            raise
+        src = None  # cache-only node: serve what we have
+    if src is not None and not _is_fresh(src, path):
+        build_cache(name, cache_dir)
+
+    df = _read_cache(path, columns)
+    return df if columns is None else df.reindex(columns=list(columns))
+
+
+# -------------------------
+# Any CSV file
+# -------------------------
+def _stable(value):
+    """
+    A read option in a form that is the same in every process: functions and classes by
+    module and qualified name, containers item by item. Options without one (lambdas,
+    objects whose repr is an address) raise ValueError, since they could never hit the cache.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return sorted(([_stable(k), _stable(v)] for k, v in value.items()), key=repr)
+    if isinstance(value, (list, tuple, set)):
+        items = [_stable(v) for v in value]
+        return sorted(items, key=repr) if isinstance(value, set) else items
+    if callable(value) and hasattr(value, "__qualname__"):
+        if "<" in value.__qualname__:
+            raise ValueError(f"read option {value!r} has no stable name; use a module-level function")
+        return f"{value.__module__}.{value.__qualname__}"
+    if " at 0x" in repr(value):
+        raise ValueError(f"read option {value!r} has no stable representation to key the cache on")
+    return repr(value)
+
+
+def _csv_cache_dir(path):
+    data_dir = os.path.abspath(DATA_DIR)
+    inside = os.path.commonpath([os.path.abspath(path), data_dir]) == data_dir
+    return CACHE_DIR if inside else USER_CACHE_DIR
+
+
+def csv_cache_path(path, cache_dir=None, read_kws=None):
+    """
+    Cache file for a CSV: its name plus a hash of its absolute path and parse options, in
+    cache_dir (default: ./datasets/.cache for CSVs under ./datasets/, else USER_CACHE_DIR).
+    """
+    key = json.dumps([os.path.abspath(path), _stable(read_kws or {})])
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return _cache_path(f"{stem}-{hashlib.sha1(key.encode()).hexdigest()[:12]}", cache_dir or _csv_cache_dir(path))
+
+
+def load_csv(path, columns=None, cache_dir=None, **read_kws) -> pd.DataFrame:
+    """
+    pd.read_csv(path, **read_kws) served from the columnar cache: the CSV is parsed once,
+    later calls read only `columns` from a memory-mapped file. Numeric columns come back
+    downcast where that is lossless (see downcast()). Callable read options (converters,
+    date parsers) must be module-level functions, so the cache key is the same every run.
+    """
+    cache = csv_cache_path(path, cache_dir, read_kws)
+    if not _is_fresh(path, cache):
+        _write_cache(downcast(pd.read_csv(path, **read_kws)), path, cache)
+    return _read_cache(cache, columns)
+
+
+def repo_csvs(root=REPO_ROOT):
+    """Every CSV under the repository (cache folders and .git skipped)."""
+    found = []
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        found += [os.path.join(folder, f) for f in files if f.lower().endswith(".csv")]
+    return sorted(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build columnar caches for named datasets or CSV files.")
+    parser.add_argument("targets", nargs="*", help="dataset names (e.g. tips) or CSV paths")
+    parser.add_argument("--all", action="store_true", help="every CSV in the repository")
+    args = parser.parse_args()
+
+    targets = args.targets or ([] if args.all else ["tips"])
+    if args.all:
+        targets += repo_csvs()
+    for target in targets:
+        if not target.lower().endswith(".csv"):
+            print(f"{target}: {build_cache(target)}")
+            continue
+        t0 = time.perf_counter()
+        try:
+            parsed = pd.read_csv(target)
+        except (UnicodeDecodeError, pd.errors.ParserError) as e:
+            # needs read options (encoding=..., sep=...): cache it with load_csv(path, **options)
+            print(f"{os.path.relpath(target, REPO_ROOT)}: skipped ({type(e).__name__})")
+            continue
+        t_csv = time.perf_counter() - t0
+        load_csv(target)
+        t0 = time.perf_counter()
+        cached = load_csv(target)
+        t_cache = time.perf_counter() - t0
+        print(f"{os.path.relpath(target, REPO_ROOT)}: {len(cached):,} rows, "
+              f"{parsed.memory_usage(deep=True).sum() / 1e6:.1f} -> {cached.memory_usage(deep=True).sum() / 1e6:.1f} MB, "
+              f"read_csv {t_csv * 1000:.1f} ms -> cached {t_cache * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Parallel, content-hash-cached figure rendering for the analytics scripts.
+
+- Each figure job is a (function, args, kwargs) triple; the function saves one PNG and
+  returns its path, exactly like the existing fig*_ functions
+- A job's key is a hash of the function's source code, every input it receives
+  (DataFrames, arrays, models, parameters) and the module-level constants it reads
+  (e.g. CAPACITY_PER_SERVER, label lists), so editing a constant re-renders the figure
+- The manifest in the output folder maps each PNG's absolute path to the function and key
+  that last wrote it; a job is skipped when its function and key own a PNG that still
+  exists, so two functions writing one file (or one function writing several) cannot
+  vouch for each other's output
+- The rest are rendered on the non-interactive Agg backend, in a process pool or, for a
+  single job, in this process (the caller's backend is restored afterwards)
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST_NAME = ".render_manifest.json"
+
+
+def _update_hash(h, obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        dtypes = obj.dtypes if isinstance(obj, pd.DataFrame) else obj.dtype
+        h.update(repr((type(obj).__name__, obj.shape, list(getattr(obj, "columns", [])),
+                       str(dtypes))).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"dict")
+        for key in sorted(obj, key=repr):
+            _update_hash(h, key)
+            _update_hash(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(type(obj).__name__.encode())
+        for item in obj:
+            _update_hash(h, item)
+    elif obj is None or isinstance(obj, (str, bytes, int, float, bool, np.generic)):
+        h.update(repr(obj).encode())
+    else:
+        # Fitted models and anything else: hash the pickled state
+        h.update(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+# Global values that count as figure inputs (modules, functions and classes do not)
+_CONSTANT_TYPES = (str, bytes, int, float, bool, np.generic, np.ndarray, list, tuple, dict,
+                   pd.DataFrame, pd.Series, pd.Index)
+
+
+def _global_names(code):
+    """Names a code object (and any lambda / comprehension nested in it) looks up."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _global_names(const)
+    return names
+
+
+def _referenced_constants(func):
+    """{name: value} of the module-level constants func reads."""
+    code = getattr(inspect.unwrap(func), "__code__", None)
+    if code is None:
+        return {}
+    glb = func.__globals__
+    return {name: glb[name] for name in sorted(_global_names(code))
+            if name in glb and isinstance(glb[name], _CONSTANT_TYPES)}
+
+
+def job_key(func, args=(), kwargs=None):
+    """Content hash of a figure job: function source + referenced constants + all inputs."""
+    h = hashlib.sha256()
+    h.update(inspect.getsource(func).encode())
+    _update_hash(h, _referenced_constants(func))
+    _update_hash(h, tuple(args))
+    _update_hash(h, dict(kwargs or {}))
+    return h.hexdigest()
+
+
+def _job_name(func):
+    return f"{os.path.basename(inspect.getfile(func))}:{func.__qualname__}"
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render(func, args, kwargs):
+    return func(*args, **kwargs)
+
+
+def _render_here(func, args, kwargs):
+    """_render in this process, on Agg like the workers, then back to the caller's backend."""
+    import matplotlib.pyplot as plt
+    backend = plt.get_backend()
+    plt.switch_backend("Agg")
+    try:
+        return _render(func, args, kwargs)
+    finally:
+        plt.switch_backend(backend)
+
+
+def _owned_path(manifest, name, key):
+    """Existing PNG last written by the job (name, key), as the job returned it, or None."""
+    for path, entry in manifest.items():
+        if entry.get("func") == name and entry.get("key") == key and os.path.exists(path):
+            return entry.get("path", path)
+    return None
+
+
+def render_figures(jobs, outdir, max_workers=None, force=False):
+    """
+    Render figure jobs, skipping any whose inputs are unchanged since the last run.
+    jobs: iterable of (func, args) or (func, args, kwargs).
+    Returns the saved paths in job order.
+    """
+    jobs = [(job[0], tuple(job[1]), dict(job[2]) if len(job) > 2 else {}) for job in jobs]
+    manifest_path = os.path.join(outdir, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    paths = [None] * len(jobs)
+    keys = [job_key(*job) for job in jobs]
+    stale = []
+    for i, ((func, _, _), key) in enumerate(zip(jobs, keys)):
+        paths[i] = None if force else _owned_path(manifest, _job_name(func), key)
+        if paths[i] is None:
+            stale.append(i)
+
+    if len(stale) == 1 or max_workers == 1:
+        for i in stale:
+            paths[i] = _render_here(*jobs[i])
+    elif stale:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as pool:
+            futures = {i: pool.submit(_render, *jobs[i]) for i in stale}
+            for i, fut in futures.items():
+                paths[i] = fut.result()
+
+    for i in stale:
+        manifest[os.path.abspath(paths[i])] = {"func": _job_name(jobs[i][0]), "key": keys[i], "path": paths[i]}
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Rendered {len(stale)} figure(s), reused {len(jobs) - len(stale)} unchanged.")
+    return paths
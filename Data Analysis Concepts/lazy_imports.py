@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+On-first-use imports for the heavy libraries the analytics scripts depend on.
+
+- lazy_import("matplotlib.pyplot") returns a stand-in module; the real import happens
+  the first time an attribute is used, so runs that never plot never load matplotlib
+- Once this module is imported, every top-level package loaded afterwards is timed
+  (self time, excluding other packages it pulls in); report_import_times() prints the table
+"""
+
+import sys
+import time
+import importlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+
+
+IMPORT_TIMES = {}
+_START = time.perf_counter()
+
+
+_FILE_LOADERS = (
+    importlib.machinery.SourceFileLoader,
+    importlib.machinery.SourcelessFileLoader,
+    importlib.machinery.ExtensionFileLoader,
+)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta-path hook that wraps each top-level package's exec_module with a timer."""
+
+    def __init__(self):
+        self._resolving = set()
+        self._stack = []  # [name, time spent in nested top-level imports]
+
+    def find_spec(self, name, path=None, target=None):
+        if "." in name or name in self._resolving:
+            return None
+        self._resolving.add(name)
+        try:
+            spec = importlib.util.find_spec(name)
+        finally:
+            self._resolving.discard(name)
+        # Only file-based loaders are per-spec instances; builtin/frozen ones are shared classes
+        if spec is None or not isinstance(spec.loader, _FILE_LOADERS):
+            return None
+
+        exec_module = spec.loader.exec_module
+        stack = self._stack
+
+        def timed_exec(module):
+            stack.append([name, 0.0])
+            t0 = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - t0
+                _, nested = stack.pop()
+                IMPORT_TIMES[name] = IMPORT_TIMES.get(name, 0.0) + elapsed - nested
+                if stack:
+                    stack[-1][1] += elapsed
+
+        spec.loader.exec_module = timed_exec
+        return spec
+
+
+sys.meta_path.insert(0, _ImportTimer())
+
+
+class LazyModule:
+    """Placeholder for a module that is imported the first time one of its attributes is read."""
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self):
+        if self._module is None:
+            object.__setattr__(self, "_module", importlib.import_module(self._name))
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Return the module if it is already imported, otherwise a LazyModule stand-in."""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def is_available(name):
+    """True if a top-level package can be imported (checked without importing it)."""
+    return importlib.util.find_spec(name) is not None
+
+
+def report_import_times(top: int = 15, file=None):
+    print("\n=== Import times (self time per top-level package) ===", file=file)
+    ranked = sorted(IMPORT_TIMES.items(), key=lambda kv: kv[1], reverse=True)
+    for name, secs in ranked[:top]:
+        print(f"  {name:<24} {secs * 1000:8.1f} ms", file=file)
+    print(f"  {'total imports':<24} {sum(IMPORT_TIMES.values()) * 1000:8.1f} ms", file=file)
+    print(f"  {'wall since start':<24} {(time.perf_counter() - _START) * 1000:8.1f} ms", file=file)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Partitioned, multi-process aggregation for the analytics scripts.
+
+- A source (one CSV or Parquet file, or a directory of them) is split into partitions:
+  byte ranges of a CSV, cut at line ends (one record per line), and the row groups of a
+  Parquet file
+- Each worker process reads its partition in chunks and builds a partial aggregate state;
+  the parent merges the states in partition order
+- Any state with a merge(other) method works: GroupCube (group_aggregates.py) and
+  StreamingSummary (streaming_stats.py) merge exactly, so the result does not depend on
+  how the source was split
+
+Usage:
+  python partitioned.py data.csv --group-by day time --values tip --jobs 8
+"""
+
+import io
+import os
+import argparse
+import functools
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+
+def _csv_header(path):
+    with open(path, "rb") as f:
+        first = f.readline()
+    return first, pd.read_csv(io.BytesIO(first)).columns.tolist()
+
+
+def csv_partitions(path: str, n_parts: int) -> list:
+    """[("csv", path, start, end), ...]: byte ranges of whole lines, header excluded."""
+    header, _ = _csv_header(path)
+    size = os.path.getsize(path)
+    cuts = [len(header)]
+    with open(path, "rb") as f:
+        for i in range(1, n_parts):
+            f.seek(max(cuts[-1], len(header) + (size - len(header)) * i // n_parts))
+            f.readline()  # move to the start of the next line
+            cuts.append(min(f.tell(), size))
+    cuts.append(size)
+    return [("csv", path, a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def parquet_partitions(path: str) -> list:
+    """[("parquet", path, row_group), ...]."""
+    if importlib.util.find_spec("pyarrow") is None:
+        raise SystemExit("Reading Parquet needs pyarrow. Install it with: pip install pyarrow")
+    import pyarrow.parquet as pq
+    return [("parquet", path, rg) for rg in range(pq.ParquetFile(path).num_row_groups)]
+
+
+def find_partitions(source: str, n_parts: int) -> list:
+    """Partitions of a file or of every CSV/Parquet file in a directory (CSV parts by size)."""
+    if os.path.isdir(source):
+        files = sorted(os.path.join(source, f) for f in os.listdir(source)
+                       if f.lower().endswith((".csv", ".parquet", ".pq")))
+    else:
+        files = [source]
+    csv_bytes = sum(os.path.getsize(f) for f in files if f.lower().endswith(".csv")) or 1
+    parts = []
+    for f in files:
+        if f.lower().endswith(".csv"):
+            parts += csv_partitions(f, max(1, round(n_parts * os.path.getsize(f) / csv_bytes)))
+        else:
+            parts += parquet_partitions(f)
+    return parts
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file."""
+
+    def __init__(self, path, start, end):
+        self._f = open(path, "rb")
+        self._f.seek(start)
+        self._left = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        n = self._f.readinto(memoryview(buf)[:min(len(buf), self._left)]) if self._left else 0
+        self._left -= n
+        return n
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def read_partition(part: tuple, chunksize: int = 500_000, columns=None):
+    """Yield DataFrame chunks of one partition."""
+    kind, path, *where = part
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, row_groups=where, columns=columns):
+            yield batch.to_pandas()
+        return
+    _, names = _csv_header(path)
+    with io.BufferedReader(_ByteRange(path, *where), buffer_size=1 << 20) as f:
+        yield from pd.read_csv(f, header=None, names=names, usecols=columns, chunksize=chunksize)
+
+
+def aggregate(source: str, build, n_jobs: int = None, n_parts: int = None):
+    """
+    build(part) -> state for every partition of source, run in n_jobs worker processes
+    (default: all cores), then merged left to right. n_parts defaults to 4 per worker so
+    uneven partitions still keep every core busy.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    parts = find_partitions(source, n_parts or 4 * n_jobs)
+    if n_jobs == 1:
+        states = map(build, parts)
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_jobs)
+        states = pool.map(build, parts)
+    merged = None
+    try:
+        for state in states:
+            merged = state if merged is None else merged.merge(state)
+    finally:
+        if n_jobs != 1:
+            pool.shutdown()
+    return merged
+
+
+def _cube_of_partition(part, dims, values, chunksize):
+    from group_aggregates import GroupCube
+    cube = None
+    for chunk in read_partition(part, chunksize, columns=[*dims, *values]):
+        c = GroupCube.from_frame(chunk, dims, values)
+        cube = c if cube is None else cube.merge(c)
+    return cube
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grouped means of a CSV/Parquet source, one partition per task.")
+    parser.add_argument("source", help="CSV or Parquet file, or a directory of them")
+    parser.add_argument("--group-by", nargs="+", required=True)
+    parser.add_argument("--values", nargs="+", required=True)
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    args = parser.parse_args()
+
+    import time
+
+    t0 = time.perf_counter()
+    build = functools.partial(_cube_of_partition, dims=args.group_by, values=args.values, chunksize=args.chunksize)
+    cube = aggregate(args.source, build, n_jobs=args.jobs)
+    print(cube.stats(args.group_by, args.values).round(4))
+    print(f"{int(cube.rows.sum()):,} rows in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
@@ -6,7 +7,12 @@ from sklearn.metrics import accuracy_score, classification_report, confusion_mat
 
 desktop_path = os.path.join(os.path.expanduser('~'), 'Desktop') #Here I am creating a file path to the users desktop and im making sure not to hard code this so it works for the assessor.
 
-train_data = pd.read_csv(os.path.join(desktop_path, 'train.csv')) # Loading the train csv file which is part of this dataset
+STREAM = '--stream' in sys.argv # Run with --stream to train chunk by chunk when train.csv is too big for memory
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'Data Analysis Concepts'))
+from dataset_cache import load_csv # parses each csv once; later runs read a cached, memory-mapped Arrow copy
+
+train_data = pd.read_csv(os.path.join(desktop_path, 'train.csv'), nrows=5) if STREAM else load_csv(os.path.join(desktop_path, 'train.csv')) # Loading the train csv file which is part of this dataset
 
 print("Data Overview:") # I am just exploring the data to gain a deeper understanding
 print(train_data.head())
@@ -14,6 +20,16 @@ print(train_data.head())
 features = ['Sex'] # I am selecting my features here
 target = 'Survived'
 
+if STREAM:
+    # Out-of-core path (streaming_logistic.py): model updated one chunk at a time, metrics on a 20% hold-out
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+                                    'Data Analysis Concepts', 'Predictive Analytics'))
+    from streaming_logistic import run_stream_script
+
+    run_stream_script(os.path.join(desktop_path, 'train.csv'), features, target,
+                      mappings={'Sex': {'male': 0, 'female': 1}}) # same encoding as below, applied to each chunk
+    sys.exit()
+
 train_data['Sex'] = train_data['Sex'].map({'male': 0, 'female': 1})# Converting categorical features into numerical
 
 train_data = train_data.dropna(subset=[*features, target]) # Dropping rows with missing values for simplicity sake
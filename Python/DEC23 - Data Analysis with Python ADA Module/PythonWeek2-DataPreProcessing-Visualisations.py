@@ -1,14 +1,18 @@
 import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
 desktop_path = os.path.join(os.path.expanduser('~'), 'Desktop') #Here I am creating a file path to the users desktop and im making sure not to hard code this so it works for the assessor.
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'Data Analysis Concepts'))
+from dataset_cache import load_csv # parses each csv once; later runs read a cached, memory-mapped Arrow copy
+
 # I am loading the datasets below using variables assigned to reading the corrsponding csv files.
-train_data = pd.read_csv(os.path.join(desktop_path, 'train.csv'))
-test_data = pd.read_csv(os.path.join(desktop_path, 'test.csv'))
-gender_submission = pd.read_csv(os.path.join(desktop_path, 'gender_submission.csv'))
+train_data = load_csv(os.path.join(desktop_path, 'train.csv'))
+test_data = load_csv(os.path.join(desktop_path, 'test.csv'))
+gender_submission = load_csv(os.path.join(desktop_path, 'gender_submission.csv'))
 
 print("Train Data:") # Display basic information about the datasets
 print(train_data.info())